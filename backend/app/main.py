@@ -1,13 +1,20 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
-from app.services.products import product_service
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import Dict, Any, Callable, Hashable, Iterator, Optional
+import numpy as np
+from app.services.products import (PRODUCTS_PAGE_MAX, PRODUCTS_PAGE_SIZE, SEARCH_MODES, SIMILAR_PRODUCTS_K,
+                                   SIMILAR_PRODUCTS_MAX, product_service)
 from app.services.chat import chat_assistant
+from app.services.metrics import RequestMetricsMiddleware, metrics
+from app.services.response_cache import RESPONSE_PAGE_CACHE_SIZE, ResponseCache, etag_matches
+from app.services.serialization import dumps, encode_array, encode_object
 
 app = FastAPI(
     title="AI Shopping Assistant API",
     description="Intelligent shopping assistant with AI-powered recommendations, real product data, and chat support",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware - allows frontend to connect
@@ -17,8 +24,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Serialized bodies of read-mostly endpoints, valid until the catalog changes
+response_cache = ResponseCache()
+page_cache = ResponseCache(RESPONSE_PAGE_CACHE_SIZE)
+
+def cached_json(endpoint: str, params: Hashable, if_none_match: Optional[str],
+                build: Callable[[], Any], cache: ResponseCache = response_cache) -> Response:
+    """
+    Serve an endpoint's JSON from the response cache, keyed by the current
+    catalog version, with an ETag; a matching If-None-Match gets an empty 304.
+    """
+    body, etag = cache.get_or_render(endpoint, params, product_service.catalog_version, build)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return json_bytes(body, headers=headers)
+
+def json_bytes(body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response for an already encoded JSON body"""
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+# Request latency histograms for /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Cache and catalog state, read when /metrics is scraped
+metrics.gauge_callback(
+    "query_cache_lookups_total", "Query embedding cache lookups",
+    lambda: [({"result": "hit"}, product_service.query_cache.hits),
+             ({"result": "miss"}, product_service.query_cache.misses)],
+    kind="counter")
+metrics.gauge_callback(
+    "query_cache_hit_ratio", "Share of query embedding lookups served from the cache",
+    lambda: [({}, product_service.query_cache.stats()["hit_rate"])])
+metrics.gauge_callback(
+    "query_cache_entries", "Query embeddings currently cached",
+    lambda: [({}, len(product_service.query_cache))])
+metrics.gauge_callback(
+    "chat_sessions", "Chat sessions currently held",
+    lambda: [({}, len(chat_assistant.sessions))])
+metrics.gauge_callback(
+    "catalog_products", "Products in the live catalog",
+    lambda: [({}, len(product_service.catalog))])
+
+@app.on_event("startup")
+def warm_up_model():
+    # Load the model and index the catalog in the background so the server
+    # accepts connections immediately; searches use keywords until then
+    product_service.start_warmup()
+
 @app.get("/")
 def read_root():
     return {
@@ -36,40 +92,148 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {
-        "status": "healthy",
-        "total_products": len(product_service.products),
-        "ai_model": "all-MiniLM-L6-v2",
-        "chat_enabled": True
+        "status": "healthy" if product_service.ready else "starting",
+        "ready": product_service.ready,
+        "warmup": product_service.warmup_status(),
+        "total_products": len(product_service.catalog),
+        "ai_model": product_service.model_name,
+        "chat_enabled": True,
+        "catalog_version": product_service.catalog_version,
+        "similar_products": product_service.similarity_status(),
+        "query_cache": product_service.query_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "chat_sessions": chat_assistant.sessions.stats()
     }
 
+@app.get("/health/live")
+def liveness() -> Dict[str, Any]:
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness() -> Dict[str, Any]:
+    """
+    Readiness probe: 200 from startup on, since searches fall back to keywords
+    until the model has loaded; degraded and warmup report the warm-up
+    """
+    return {
+        "ready": True,
+        "degraded": not product_service.ready,
+        "total_products": len(product_service.catalog),
+        "warmup": product_service.warmup_status(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Latency histograms, counters and cache stats in the Prometheus text format"""
+    if not metrics.enabled:
+        return PlainTextResponse("# metrics are disabled (METRICS_ENABLED=0)\n", status_code=404)
+    return PlainTextResponse(metrics.expose(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/products")
-def get_products() -> List[Dict[str, Any]]:
-    """Get all products"""
-    return product_service.get_all_products()
+def get_products(
+    ids: str = Query(None, description="Comma-separated product ids to fetch in one request"),
+    cursor: str = Query(None, description="next_cursor of the previous page; empty for the first page"),
+    limit: int = Query(None, description=f"Products per page, at most {PRODUCTS_PAGE_MAX}"),
+    output: str = Query("json", alias="format",
+                        description="json, or ndjson to stream the catalog one product per line"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    Get all products, only the requested ids, or one page of products.
+
+    Passing cursor or limit returns a page object whose next_cursor fetches
+    the following page (null after the last one). format=ndjson streams the
+    whole catalog, or the rest of it from a cursor, as newline-delimited JSON.
+    """
+    if ids is not None:
+        try:
+            product_ids = [int(product_id) for product_id in ids.split(',') if product_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+        # Arbitrary id lists would only churn the cache; they are spliced from
+        # per-product fragments anyway
+        return json_bytes(product_service.encode_products(product_ids))
+    
+    if output not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be json or ndjson")
+    start = _parse_cursor(cursor)
+    if output == "ndjson":
+        return StreamingResponse(product_service.export_ndjson(start), media_type="application/x-ndjson",
+                                 headers={"X-Catalog-Version": str(product_service.catalog_version)})
+    
+    if cursor is None and limit is None:
+        return cached_json("products", None, if_none_match, product_service.encode_products)
+    if limit is None:
+        limit = PRODUCTS_PAGE_SIZE
+    if not 1 <= limit <= PRODUCTS_PAGE_MAX:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {PRODUCTS_PAGE_MAX}")
+    return cached_json("products-page", (start, limit), if_none_match, lambda: _build_products_page(start, limit),
+                       cache=page_cache)
+
+def _parse_cursor(cursor: Optional[str]) -> int:
+    """Row a page cursor points at; a missing or empty cursor is the first row"""
+    if not cursor:
+        return 0
+    # ASCII digits only: int() would take signs, spaces, underscores and other
+    # scripts' digits, and isdigit() passes superscripts int() rejects
+    if not (cursor.isascii() and cursor.isdecimal()):
+        raise HTTPException(status_code=422, detail="cursor must be a next_cursor value from a previous page")
+    return int(cursor)
+
+def _build_products_page(start: int, limit: int) -> bytes:
+    products, next_row = product_service.products_page(start, limit)
+    
+    return encode_object({
+        "products": encode_array(products),
+        "next_cursor": None if next_row is None else str(next_row),
+        "limit": limit,
+        "total_products": len(product_service.catalog)
+    })
 
 @app.get("/api/products/{product_id}")
-def get_product(product_id: int) -> Dict[str, Any]:
+def get_product(product_id: int) -> Response:
     """Get a specific product"""
-    product = product_service.get_product_by_id(product_id)
+    product = product_service.encode_product(product_id)
     if not product:
         return {"error": "Product not found"}
-    return product
+    return json_bytes(product)
+
+@app.get("/api/products/{product_id}/similar")
+def get_similar_products(
+    product_id: int,
+    limit: int = Query(SIMILAR_PRODUCTS_K, description=f"Number of similar products, at most {SIMILAR_PRODUCTS_MAX}"),
+) -> Response:
+    """Products most similar to a product, read off the precomputed neighbour graph"""
+    if not 1 <= limit <= SIMILAR_PRODUCTS_MAX:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {SIMILAR_PRODUCTS_MAX}")
+    similar = product_service.similar_fragments(product_id, limit)
+    if similar is None:
+        return {"error": "Product not found"}
+    products, source = similar
+    return json_bytes(encode_object({
+        "product_id": product_id,
+        "total_results": len(products),
+        "products": encode_array(products),
+        "source": source,
+    }))
 
 @app.get("/api/refresh-products")
 def refresh_products():
-    """Refresh product data from external APIs"""
-    try:
-        product_service.refresh_products()
-        return {
-            "message": "Products refreshed successfully",
-            "total_products": len(product_service.products),
-            "status": "success"
-        }
-    except Exception as e:
-        return {
-            "error": f"Failed to refresh products: {str(e)}",
-            "status": "error"
-        }
+    """Start refreshing product data from external APIs in the background"""
+    started = product_service.start_refresh()
+    return {
+        "message": "Product refresh started" if started else "A product refresh is already running",
+        "total_products": len(product_service.catalog),
+        "status": "accepted" if started else "running",
+        "status_url": "/api/refresh-products/status"
+    }
+
+@app.get("/api/refresh-products/status")
+def refresh_products_status() -> Dict[str, Any]:
+    """Progress and outcome of the latest product refresh"""
+    return product_service.refresh_status()
 
 @app.get("/api/search")
 def search_products(
@@ -78,38 +242,36 @@ def search_products(
     category: str = Query(None, description="Filter by category"),
     min_price: float = Query(None, description="Minimum price"),
     max_price: float = Query(None, description="Maximum price"),
-) -> Dict[str, Any]:
+    mode: str = Query("semantic", description="Retrieval mode: semantic, lexical or hybrid"),
+) -> Response:
     """AI-powered semantic search"""
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
     
-    # First do AI semantic search
-    results = product_service.search_products(q, top_k=limit)
+    # Keyword matching stands in for the model while it is still loading
+    ready = product_service.ready
     
-    # Then apply filters if provided
-    if category or min_price is not None or max_price is not None:
-        filtered_results = []
-        for product in results:
-            if category and product['category'].lower() != category.lower():
-                continue
-            if min_price is not None and product['price'] < min_price:
-                continue
-            if max_price is not None and product['price'] > max_price:
-                continue
-            filtered_results.append(product)
-        results = filtered_results
+    # AI semantic search, ranking only the products that pass the filters
+    # Products come back already encoded and are spliced into the body
+    results = product_service.search_fragments(
+        q, top_k=limit, category=category, min_price=min_price, max_price=max_price, mode=mode
+    )
     
-    return {
+    return json_bytes(encode_object({
         "query": q,
         "total_results": len(results),
-        "products": results[:limit],
+        "products": encode_array(results[:limit]),
+        "mode": mode if ready else "lexical",
+        "degraded": not ready,
         "filters_applied": {
             "category": category,
             "min_price": min_price,
             "max_price": max_price
         }
-    }
+    }))
 
 @app.post("/api/chat")
-def chat_with_assistant(message: dict) -> Dict[str, Any]:
+def chat_with_assistant(message: dict) -> Response:
     """Chat with AI shopping assistant"""
     user_message = message.get('message', '')
     user_id = message.get('user_id', None)
@@ -124,7 +286,7 @@ def chat_with_assistant(message: dict) -> Dict[str, Any]:
     
     try:
         response = chat_assistant.process_message(user_message, user_id)
-        return response
+        return ORJSONResponse(response)
     except Exception as e:
         print(f"Chat error: {e}")  # Log error for debugging
         return {
@@ -134,63 +296,92 @@ def chat_with_assistant(message: dict) -> Dict[str, Any]:
             "error_details": str(e) if app.debug else None
         }
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+@app.post("/api/chat/stream")
+def chat_stream(message: dict) -> StreamingResponse:
+    """
+    Chat with AI shopping assistant over Server-Sent Events.
+
+    Emits 'intent' as soon as the message is classified, 'products' once
+    retrieval completes, then the reply text as 'message' deltas and a final
+    'done' (or 'error').
+    """
+    user_message = message.get('message', '')
+    user_id = message.get('user_id', None)
+    
+    def events() -> Iterator[str]:
+        if not user_message.strip():
+            yield _sse("error", {
+                "error": "Message cannot be empty",
+                "message": "Please enter a message to chat with me!"
+            })
+            return
+        try:
+            for event, data in chat_assistant.stream_message(user_message, user_id):
+                yield _sse(event, data)
+        except Exception as e:
+            print(f"Chat error: {e}")  # Log error for debugging
+            yield _sse("error", {
+                "message": "Sorry, I'm having trouble processing your request. Please try again! 🤖",
+                "error_details": str(e) if app.debug else None
+            })
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/api/categories")
-def get_categories() -> Dict[str, Any]:
+def get_categories(if_none_match: Optional[str] = Header(None)) -> Response:
     """Get all available product categories"""
-    categories = set()
-    for product in product_service.products:
-        categories.add(product['category'])
+    return cached_json("categories", None, if_none_match, _build_categories)
+
+def _build_categories() -> Dict[str, Any]:
+    categories = product_service.aggregates.categories()
     
     return {
-        "categories": sorted(list(categories)),
+        "categories": categories,
         "total_categories": len(categories)
     }
 
 @app.get("/api/brands")
-def get_brands() -> Dict[str, Any]:
+def get_brands(if_none_match: Optional[str] = Header(None)) -> Response:
     """Get all available brands"""
-    brands = set()
-    for product in product_service.products:
-        brands.add(product['brand'])
+    return cached_json("brands", None, if_none_match, _build_brands)
+
+def _build_brands() -> Dict[str, Any]:
+    brands = product_service.aggregates.brands()
     
     return {
-        "brands": sorted(list(brands)),
+        "brands": brands,
         "total_brands": len(brands)
     }
 
 @app.get("/api/stats")
-def get_stats() -> Dict[str, Any]:
+def get_stats(if_none_match: Optional[str] = Header(None)) -> Response:
     """Get platform statistics"""
-    products = product_service.products
+    return cached_json("stats", None, if_none_match, _build_stats)
+
+def _build_stats() -> Dict[str, Any]:
+    # Maintained incrementally as the catalog changes
+    aggregates = product_service.aggregates
     
-    # Calculate stats
-    total_products = len(products)
-    avg_price = sum(p['price'] for p in products) / total_products if products else 0
+    total_products = aggregates.count
+    avg_price = aggregates.average_price
     price_range = {
-        "min": min(p['price'] for p in products) if products else 0,
-        "max": max(p['price'] for p in products) if products else 0
+        "min": aggregates.min_price,
+        "max": aggregates.max_price
     }
-    
-    # Category distribution
-    category_counts = {}
-    for product in products:
-        category = product['category']
-        category_counts[category] = category_counts.get(category, 0) + 1
-    
-    # Brand distribution (top 10)
-    brand_counts = {}
-    for product in products:
-        brand = product['brand']
-        brand_counts[brand] = brand_counts.get(brand, 0) + 1
-    
-    top_brands = sorted(brand_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    category_counts = aggregates.category_counts
+    top_brands = aggregates.top_brands(10)
     
     return {
         "total_products": total_products,
         "average_price": round(avg_price, 2),
         "price_range": price_range,
         "categories": category_counts,
-        "top_brands": dict(top_brands),
+        "top_brands": top_brands,
         "ai_features": {
             "semantic_search": True,
             "chat_assistant": True,
@@ -201,33 +392,37 @@ def get_stats() -> Dict[str, Any]:
 
 # Add some fun Easter egg endpoints
 @app.get("/api/surprise")
-def surprise_me() -> Dict[str, Any]:
+def surprise_me() -> Response:
     """Get a surprise product recommendation"""
     import random
     
-    if not product_service.products:
+    catalog = product_service.catalog
+    if not len(catalog):
         return {"message": "No products available for surprises!"}
     
-    surprise_product = random.choice(product_service.products)
+    surprise_product = catalog.fragments[random.randrange(len(catalog))]
     
-    return {
+    return json_bytes(encode_object({
         "message": "🎉 Surprise! Here's a random product you might like:",
         "product": surprise_product,
         "why": "Sometimes the best discoveries are unexpected! ✨"
-    }
+    }))
 
 @app.get("/api/deal-of-the-day")
-def deal_of_the_day() -> Dict[str, Any]:
+def deal_of_the_day(if_none_match: Optional[str] = Header(None)) -> Response:
     """Get the deal of the day (lowest priced product with good rating)"""
+    return cached_json("deal-of-the-day", None, if_none_match, _build_deal_of_the_day)
+
+def _build_deal_of_the_day() -> Dict[str, Any]:
+    # Find products with good ratings (4.0+)
+    catalog = product_service.catalog
+    good_rows = np.flatnonzero(catalog.ratings >= 4.0)
     
-    # Find products with good ratings (4.0+) sorted by price
-    good_products = [p for p in product_service.products if p.get('rating', 0) >= 4.0]
-    
-    if not good_products:
+    if not len(good_rows):
         return {"message": "No deals available today"}
     
-    # Sort by price to find the best value
-    deal_product = min(good_products, key=lambda x: x['price'])
+    # Pick the lowest price to find the best value
+    deal_product = catalog.row(good_rows[np.argmin(catalog.prices[good_rows])])
     
     return {
         "message": "💎 Today's Best Deal - Great Quality, Great Price!",
@@ -246,6 +441,7 @@ async def not_found_handler(request, exc):
             "/api/products",
             "/api/search", 
             "/api/chat",
+            "/api/chat/stream",
             "/api/refresh-products",
             "/api/categories",
             "/api/brands",
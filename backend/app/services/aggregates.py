@@ -0,0 +1,147 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+
+# (old product, new product) pairs; old is None for additions, new is None for removals
+ProductChange = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class CatalogAggregates:
+    """
+    Catalog statistics maintained incrementally.
+
+    Holds product count, price sum, the sorted distinct prices (for min/max),
+    and per-category and per-brand counts. add/remove/apply update them as
+    products change, so /api/stats, /api/categories and /api/brands never
+    have to walk the catalog. Derived views (sorted names, top brands) are
+    cached until the counts they depend on change.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.price_sum = 0.0
+        self.price_counts = {}
+        self.sorted_prices = []
+        self.category_counts = {}
+        self.brand_counts = {}
+        self._categories = None
+        self._brands = None
+        self._top_brands = None
+
+    @classmethod
+    def from_products(cls, products: Iterable[Dict[str, Any]]) -> "CatalogAggregates":
+        aggregates = cls()
+        for product in products:
+            aggregates.add(product)
+        return aggregates
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "CatalogAggregates":
+        """Full recompute from a ProductCatalog's columns"""
+        aggregates = cls()
+        aggregates.count = len(catalog)
+        aggregates.price_sum = float(catalog.prices.sum())
+        for price in catalog.prices.tolist():
+            aggregates.price_counts[price] = aggregates.price_counts.get(price, 0) + 1
+        aggregates.sorted_prices = sorted(aggregates.price_counts)
+        aggregates.category_counts = catalog.category_counts()
+        aggregates.brand_counts = catalog.brand_counts()
+        return aggregates
+
+    def copy(self) -> "CatalogAggregates":
+        aggregates = CatalogAggregates()
+        aggregates.count = self.count
+        aggregates.price_sum = self.price_sum
+        aggregates.price_counts = dict(self.price_counts)
+        aggregates.sorted_prices = list(self.sorted_prices)
+        aggregates.category_counts = dict(self.category_counts)
+        aggregates.brand_counts = dict(self.brand_counts)
+        return aggregates
+
+    def add(self, product: Dict[str, Any]) -> None:
+        price = float(product['price'])
+        self.count += 1
+        self.price_sum += price
+        if price not in self.price_counts:
+            self.price_counts[price] = 0
+            insort(self.sorted_prices, price)
+        self.price_counts[price] += 1
+        self._increment(self.category_counts, product['category'], 1)
+        self._increment(self.brand_counts, product['brand'], 1)
+        self._invalidate()
+
+    def remove(self, product: Dict[str, Any]) -> None:
+        price = float(product['price'])
+        self.count -= 1
+        self.price_sum -= price
+        self.price_counts[price] -= 1
+        if not self.price_counts[price]:
+            del self.price_counts[price]
+            del self.sorted_prices[bisect_left(self.sorted_prices, price)]
+        self._increment(self.category_counts, product['category'], -1)
+        self._increment(self.brand_counts, product['brand'], -1)
+        self._invalidate()
+
+    def apply(self, changes: Iterable[ProductChange]) -> "CatalogAggregates":
+        """Apply a batch of (old, new) product changes; returns self"""
+        for old, new in changes:
+            if old is not None:
+                self.remove(old)
+            if new is not None:
+                self.add(new)
+        return self
+
+    @staticmethod
+    def _increment(counts: Dict[str, int], key: str, delta: int) -> None:
+        counts[key] = counts.get(key, 0) + delta
+        if not counts[key]:
+            del counts[key]
+
+    def _invalidate(self) -> None:
+        self._categories = None
+        self._brands = None
+        self._top_brands = None
+
+    @property
+    def average_price(self) -> float:
+        return self.price_sum / self.count if self.count else 0
+
+    @property
+    def min_price(self) -> float:
+        return self.sorted_prices[0] if self.sorted_prices else 0
+
+    @property
+    def max_price(self) -> float:
+        return self.sorted_prices[-1] if self.sorted_prices else 0
+
+    def categories(self) -> List[str]:
+        if self._categories is None:
+            self._categories = sorted(self.category_counts)
+        return self._categories
+
+    def brands(self) -> List[str]:
+        if self._brands is None:
+            self._brands = sorted(self.brand_counts)
+        return self._brands
+
+    def top_brands(self, limit: int = 10) -> Dict[str, int]:
+        """Brands with the most products, most first"""
+        if self._top_brands is None:
+            self._top_brands = sorted(self.brand_counts.items(), key=lambda x: x[1], reverse=True)
+        return dict(self._top_brands[:limit])
+
+    def verify(self, catalog) -> List[str]:
+        """Compare against a full recompute from the catalog; returns the mismatches"""
+        expected = CatalogAggregates.from_catalog(catalog)
+        mismatches = []
+        if self.count != expected.count:
+            mismatches.append(f"count {self.count} != {expected.count}")
+        if not math.isclose(self.price_sum, expected.price_sum, rel_tol=1e-9, abs_tol=1e-6):
+            mismatches.append(f"price_sum {self.price_sum} != {expected.price_sum}")
+        if self.sorted_prices != expected.sorted_prices:
+            mismatches.append("distinct prices differ")
+        if self.category_counts != expected.category_counts:
+            mismatches.append("category counts differ")
+        if self.brand_counts != expected.brand_counts:
+            mismatches.append("brand counts differ")
+        return mismatches
@@ -0,0 +1,129 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+import queue
+import threading
+import time
+import numpy as np
+
+
+class EncodingBatcher:
+    """
+    Micro-batching scheduler for query encoding.
+
+    Callers block in encode() while a single worker thread gathers every
+    query that arrives within max_wait_ms (or until max_batch_size is
+    reached) and runs them through one batched encode call, then hands each
+    caller its own row of the result.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 3.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="encoding-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embedding of a single text, computed as part of a shared batch"""
+        if self._closed:
+            raise RuntimeError("EncodingBatcher is closed")
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.encode_fn(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "queries": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+def measure_encoding(encode_one: Callable[[str], Any], texts: List[str], concurrency: int) -> Dict[str, float]:
+    """Latency percentiles and throughput of encode_one under concurrent callers"""
+    def timed(text: str) -> float:
+        start = time.perf_counter()
+        encode_one(text)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, texts)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "throughput_qps": round(len(texts) / elapsed, 1),
+    }
+
+
+def compare_batched_encoding(encode_fn: Callable[[List[str]], np.ndarray], texts: List[str],
+                             concurrency: int = 16, max_batch_size: int = 32,
+                             max_wait_ms: float = 3.0) -> Dict[str, Any]:
+    """Run the same concurrent workload unbatched and through an EncodingBatcher"""
+    unbatched = measure_encoding(lambda text: encode_fn([text])[0], texts, concurrency)
+
+    batcher = EncodingBatcher(encode_fn, max_batch_size, max_wait_ms)
+    try:
+        batched = measure_encoding(batcher.encode, texts, concurrency)
+        batched.update(batcher.stats())
+    finally:
+        batcher.close()
+
+    return {
+        "queries": len(texts),
+        "concurrency": concurrency,
+        "unbatched": unbatched,
+        "batched": batched,
+    }
@@ -1,90 +1,128 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import json
 import re
+import time
+from app.services.intents import WORD_PATTERN, analyze_message, detect_follow_up
+from app.services.metrics import CHAT_MESSAGES, CHAT_STAGE_SECONDS, metrics
 from app.services.products import product_service
+from app.services.sessions import ChatSession, SessionStore
+
+# Products kept per session from each search, so follow-ups have something
+# to re-filter and re-rank
+SESSION_CANDIDATES = 24
+
+# Words that carry no search subject of their own
+SEARCH_STOP_WORDS = {'find', 'show', 'get', 'me', 'a', 'an', 'the', 'for', 'with', 'under', 'below', 'above', 'over'}
+
+# Words that can surround a follow-up phrase ("do you have any cheaper ones?")
+# without naming anything new to search for
+FOLLOW_UP_FILLER = {
+    'one', 'ones', 'option', 'options', 'item', 'items', 'product', 'products', 'something', 'anything',
+    'some', 'any', 'those', 'these', 'them', 'that', 'this', 'it', 'what', 'about', 'how', 'do', 'does',
+    'you', 'have', 'got', 'i', 'want', 'would', 'like', 'see', 'is', 'are', 'there', 'can', 'could',
+    'please', 'instead', 'maybe', 'and', 'or', 'but', 'ok', 'okay', 'now', 'just', 'only', 'bit',
+    'little', 'more', 'less', 'of', 'in', 'to', 'too', 'thanks',
+}
+
+# Streamed message text is sent a few words at a time (whitespace kept)
+STREAM_CHUNK_PATTERN = re.compile(r'(?:\S+\s*){1,4}|\s+')
 
 class ShoppingChatAssistant:
     def __init__(self):
-        self.conversation_history = []
+        self.sessions = SessionStore()
         
     def process_message(self, message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Process user message and return AI response with product recommendations"""
+        session, intent, follow_up = self._prepare(message, user_id)
+        return self._respond(message, session, intent, follow_up)
+    
+    def stream_message(self, message: str, user_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process user message as a sequence of (event, data) pairs:
+        'intent' as soon as the message is classified, 'products' once
+        retrieval completes, then 'message' text deltas and a final 'done'.
+        """
+        session, intent, follow_up = self._prepare(message, user_id)
+        yield 'intent', {
+            'intent': 'follow_up' if follow_up else intent['type'],
+            'budget': intent['budget'],
+            'category': intent['category']
+        }
+        
+        response = self._respond(message, session, intent, follow_up)
+        text = response.pop('message')
+        yield 'products', response
+        
+        for chunk in STREAM_CHUNK_PATTERN.findall(text):
+            yield 'message', {'delta': chunk}
+        yield 'done', {'length': len(text)}
+    
+    def _prepare(self, message: str, user_id: Optional[str]) -> Tuple[Optional[ChatSession], Dict[str, Any], Optional[Dict]]:
+        """Look up the user's session and classify the message"""
+        start = time.perf_counter()
+        
+        # Anonymous messages get no session, so no follow-ups
+        session = self.sessions.get(user_id) if user_id else None
         
         # Analyze the message to understand intent
         intent = self._analyze_intent(message)
         
-        # Generate response based on intent
-        if intent['type'] == 'product_search':
-            return self._handle_product_search(message, intent)
+        # Follow-ups about the last results are answered from the session,
+        # unless the message also names something new ("show me premium
+        # laptops" is a search, not "pricier" headphones)
+        follow_up = detect_follow_up(message) if session is not None and session.has_results() else None
+        if follow_up and self._names_new_subject(follow_up['rest'], session):
+            follow_up = None
+        
+        metrics.observe(CHAT_STAGE_SECONDS, time.perf_counter() - start,
+                        'follow_up' if follow_up else intent['type'], 'classify')
+        return session, intent, follow_up
+    
+    def _respond(self, message: str, session: Optional[ChatSession], intent: Dict[str, Any],
+                 follow_up: Optional[Dict]) -> Dict[str, Any]:
+        """Run retrieval for the message and build the reply"""
+        label = 'follow_up' if follow_up else intent['type']
+        metrics.inc(CHAT_MESSAGES, label)
+        timer = metrics.timer(CHAT_STAGE_SECONDS, label)
+        
+        if follow_up:
+            response = self._handle_follow_up(session, follow_up)
+        elif intent['type'] == 'product_search':
+            response = self._handle_product_search(message, intent, session)
         elif intent['type'] == 'comparison':
-            return self._handle_comparison(message, intent)
+            response = self._handle_comparison(message, intent, session)
         elif intent['type'] == 'recommendation':
-            return self._handle_recommendation(message, intent)
+            response = self._handle_recommendation(message, intent, session)
         elif intent['type'] == 'question':
-            return self._handle_question(message, intent)
+            response = self._handle_question(message, intent, session)
         else:
-            return self._handle_general(message)
+            response = self._handle_general(message)
+        timer.lap('respond')
+        
+        if session is not None:
+            if response['products'] and response.get('follow_up') != 'select':
+                session.shown_ids = [product['id'] for product in response['products']]
+            session.add_turn(message, response)
+            self.sessions.save(session)
+            timer.lap('session')
+        return response
     
     def _analyze_intent(self, message: str) -> Dict[str, Any]:
-        """Analyze user message to understand intent"""
-        message_lower = message.lower()
-        
-        # Search for products patterns
-        search_patterns = [
-            r'find.*(?:headphones?|earbuds?|speakers?)',
-            r'(?:show|find|search).*(?:laptop|computer|phone)',
-            r'(?:looking for|need|want).*(?:shoes?|sneakers?|boots?)',
-            r'(?:find|show).*(?:under|below|less than).*\$?\d+',
-            r'(?:budget|cheap|affordable).*(?:laptop|phone|headphones?)'
-        ]
-        
-        # Comparison patterns
-        comparison_patterns = [
-            r'(?:compare|vs|versus|better|difference)',
-            r'(?:which is better|what.*difference)',
-            r'(?:should i get|choose between)'
-        ]
-        
-        # Recommendation patterns
-        recommendation_patterns = [
-            r'(?:recommend|suggest|advice)',
-            r'(?:what should i|help me choose)',
-            r'(?:best.*for|good.*for)'
-        ]
-        
-        # Question patterns
-        question_patterns = [
-            r'(?:how much|what.*price|cost)',
-            r'(?:is.*good|worth it|reliable)',
-            r'(?:what.*features|specs|specifications)'
-        ]
-        
-        # Determine intent
-        if any(re.search(pattern, message_lower) for pattern in search_patterns):
-            return {'type': 'product_search', 'query': message}
-        elif any(re.search(pattern, message_lower) for pattern in comparison_patterns):
-            return {'type': 'comparison', 'query': message}
-        elif any(re.search(pattern, message_lower) for pattern in recommendation_patterns):
-            return {'type': 'recommendation', 'query': message}
-        elif any(re.search(pattern, message_lower) for pattern in question_patterns):
-            return {'type': 'question', 'query': message}
-        else:
-            return {'type': 'general', 'query': message}
+        """Analyze user message to understand intent, budget and category"""
+        analysis = analyze_message(message)
+        analysis['query'] = message
+        return analysis
     
-    def _handle_product_search(self, message: str, intent: Dict) -> Dict[str, Any]:
+    def _handle_product_search(self, message: str, intent: Dict,
+                               session: Optional[ChatSession] = None) -> Dict[str, Any]:
         """Handle product search requests"""
         
         # Extract search parameters
         search_query = self._extract_search_terms(message)
-        budget = self._extract_budget(message)
-        category = self._extract_category(message)
-        
-        # Search products
-        products = product_service.search_products(search_query, top_k=6)
+        budget = intent['budget']
         
-        # Apply budget filter if found
-        if budget:
-            products = [p for p in products if p['price'] <= budget]
+        # Search products within budget (if one was found)
+        products = self._search(session, search_query, intent, top_k=6, max_price=budget)
         
         # Generate natural response
         if products:
@@ -100,12 +138,13 @@ class ShoppingChatAssistant:
             'budget': budget
         }
     
-    def _handle_comparison(self, message: str, intent: Dict) -> Dict[str, Any]:
+    def _handle_comparison(self, message: str, intent: Dict,
+                           session: Optional[ChatSession] = None) -> Dict[str, Any]:
         """Handle product comparison requests"""
         
         # Extract product names or categories to compare
         search_terms = self._extract_search_terms(message)
-        products = product_service.search_products(search_terms, top_k=4)
+        products = self._search(session, search_terms, intent, top_k=4)
         
         if len(products) >= 2:
             response_text = f"Here are some great options to compare:\n\n"
@@ -123,17 +162,15 @@ class ShoppingChatAssistant:
             'intent': 'comparison'
         }
     
-    def _handle_recommendation(self, message: str, intent: Dict) -> Dict[str, Any]:
+    def _handle_recommendation(self, message: str, intent: Dict,
+                               session: Optional[ChatSession] = None) -> Dict[str, Any]:
         """Handle recommendation requests"""
         
         # Extract what they're looking for
         search_terms = self._extract_search_terms(message)
-        budget = self._extract_budget(message)
+        budget = intent['budget']
         
-        products = product_service.search_products(search_terms, top_k=5)
-        
-        if budget:
-            products = [p for p in products if p['price'] <= budget]
+        products = self._search(session, search_terms, intent, top_k=5, max_price=budget)
         
         if products:
             best_product = products[0]
@@ -151,11 +188,12 @@ class ShoppingChatAssistant:
             'intent': 'recommendation'
         }
     
-    def _handle_question(self, message: str, intent: Dict) -> Dict[str, Any]:
+    def _handle_question(self, message: str, intent: Dict,
+                         session: Optional[ChatSession] = None) -> Dict[str, Any]:
         """Handle questions about products"""
         
         search_terms = self._extract_search_terms(message)
-        products = product_service.search_products(search_terms, top_k=3)
+        products = self._search(session, search_terms, intent, top_k=3)
         
         if products:
             product = products[0]
@@ -174,6 +212,72 @@ class ShoppingChatAssistant:
             'intent': 'question'
         }
     
+    def _search(self, session: Optional[ChatSession], query: str, intent: Dict, top_k: int,
+                max_price: Optional[float] = None) -> List[Dict]:
+        """Search products, remembering a wider candidate set in the session"""
+        if session is None:
+            return product_service.search_products(query, top_k=top_k, max_price=max_price)
+        
+        products = product_service.search_products(query, top_k=max(top_k, SESSION_CANDIDATES), max_price=max_price)
+        # The query embedding was just cached by the search, so this does not re-encode
+        query_embedding = product_service.encode_query(query) if query.strip() and product_service.ready else None
+        session.set_results(query, intent['category'], [product['id'] for product in products],
+                            [product['id'] for product in products[:top_k]], query_embedding)
+        return products[:top_k]
+    
+    def _handle_follow_up(self, session: ChatSession, follow_up: Dict) -> Dict[str, Any]:
+        """Answer a follow-up by re-filtering or re-ranking the session's last results"""
+        
+        action = follow_up['action']
+        if session.query_embedding is not None:
+            candidates = product_service.score_products(session.candidate_ids, session.query_embedding)
+        else:
+            candidates = product_service.get_products_by_ids(session.candidate_ids)
+        shown = product_service.get_products_by_ids(session.shown_ids)
+        
+        if action == 'select':
+            position = follow_up['position']
+            if not shown or position >= len(shown):
+                response_text = f"I only showed you {len(shown)} options. Which one would you like to know more about?"
+                products = []
+            else:
+                product = shown[position]
+                response_text = f"Here's more about the **{product['name']}**:\n\n"
+                response_text += f"💰 Price: ${product['price']:.2f}\n"
+                response_text += f"⭐ Rating: {product['rating']}/5 ({product['review_count']} reviews)\n"
+                response_text += f"🏷️ Brand: {product['brand']}\n\n"
+                response_text += f"{product['description']}"
+                products = [product]
+        elif action in ('cheaper', 'pricier'):
+            # Relative to the average price of what was last shown
+            prices = [product['price'] for product in shown] or [product['price'] for product in candidates[:4]]
+            average = sum(prices) / len(prices)
+            if action == 'cheaper':
+                products = [product for product in candidates if product['price'] < average][:4]
+                found, missing = "Here are some more affordable", "Those were already the most affordable"
+            else:
+                products = [product for product in candidates if product['price'] > average][:4]
+                found, missing = "Here are some higher-end", "Those were already the top-end"
+            if products:
+                response_text = f"{found} options for '{session.query}':\n\n"
+                for i, product in enumerate(products):
+                    response_text += f"{i+1}. **{product['name']}** - ${product['price']:.2f}\n"
+            else:
+                response_text = f"{missing} matches for '{session.query}'. Want to try a different search?"
+        else:
+            products = sorted(candidates, key=lambda p: (p['rating'], p['review_count']), reverse=True)[:4]
+            response_text = f"Here are the best-rated options for '{session.query}':\n\n"
+            for i, product in enumerate(products):
+                response_text += f"{i+1}. **{product['name']}** - ⭐ {product['rating']}/5 ({product['review_count']} reviews)\n"
+        
+        return {
+            'message': response_text,
+            'products': products,
+            'intent': 'follow_up',
+            'follow_up': action,
+            'search_query': session.query
+        }
+    
     def _handle_general(self, message: str) -> Dict[str, Any]:
         """Handle general conversation"""
         
@@ -206,56 +310,21 @@ class ShoppingChatAssistant:
             'intent': 'general'
         }
     
+    @staticmethod
+    def _names_new_subject(rest: str, session: ChatSession) -> bool:
+        """True if what surrounds a follow-up phrase asks for something beyond the last search"""
+        previous = set((session.query or '').split())
+        return any(word not in SEARCH_STOP_WORDS and word not in FOLLOW_UP_FILLER and word not in previous
+                   for word in WORD_PATTERN.findall(rest))
+    
     def _extract_search_terms(self, message: str) -> str:
         """Extract main search terms from message"""
         # Remove common stop words and focus on product-related terms
-        stop_words = {'find', 'show', 'get', 'me', 'a', 'an', 'the', 'for', 'with', 'under', 'below', 'above', 'over'}
-        
-        # Clean the message
-        words = re.findall(r'\b\w+\b', message.lower())
-        search_words = [word for word in words if word not in stop_words]
+        words = WORD_PATTERN.findall(message.lower())
+        search_words = [word for word in words if word not in SEARCH_STOP_WORDS]
         
         return ' '.join(search_words[:6])  # Limit to 6 words for better search
     
-    def _extract_budget(self, message: str) -> Optional[float]:
-        """Extract budget from message"""
-        # Look for price patterns
-        price_patterns = [
-            r'\$(\d+(?:\.\d{2})?)',
-            r'under (\d+)',
-            r'below (\d+)',
-            r'less than (\d+)',
-            r'budget (\d+)'
-        ]
-        
-        for pattern in price_patterns:
-            match = re.search(pattern, message.lower())
-            if match:
-                try:
-                    return float(match.group(1))
-                except ValueError:
-                    continue
-        
-        return None
-    
-    def _extract_category(self, message: str) -> Optional[str]:
-        """Extract product category from message"""
-        categories = {
-            'electronics': ['phone', 'laptop', 'computer', 'tablet', 'camera', 'headphones', 'speaker'],
-            'clothing': ['shirt', 'pants', 'dress', 'jacket', 'clothes', 'jeans'],
-            'footwear': ['shoes', 'sneakers', 'boots', 'sandals'],
-            'home & kitchen': ['kitchen', 'cooking', 'blender', 'pot', 'appliance'],
-            'furniture': ['chair', 'desk', 'table', 'furniture'],
-            'sports & outdoors': ['fitness', 'exercise', 'outdoor', 'sports']
-        }
-        
-        message_lower = message.lower()
-        for category, keywords in categories.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return category
-        
-        return None
-    
     def _generate_search_response(self, query: str, products: List[Dict], budget: Optional[float]) -> str:
         """Generate natural language response for search results"""
         
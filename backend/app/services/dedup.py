@@ -0,0 +1,199 @@
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+import zlib
+import numpy as np
+
+# Shingle-set Jaccard similarity at which two products count as the same item
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.75"))
+# MinHash signature length, split into DEDUP_BANDS LSH bands of equal width
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Candidates whose MinHash estimate is this far below the threshold skip the exact check
+ESTIMATE_SLACK = 0.2
+# Shingles processed per MinHash block (rows of a block x num_perm uint64 matrix)
+MINHASH_BLOCK = 65536
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """np.unique by sorting, which some NumPy versions beat with hashing only for small inputs"""
+    values = np.sort(values)
+    if not len(values):
+        return values
+    return values[np.concatenate([[True], values[1:] != values[:-1]])]
+
+
+def shingle(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed shingles of each text, its words and word bigrams, as one flat
+    array sorted and de-duplicated within each text, plus offsets: text i's
+    shingles are shingles[offsets[i]:offsets[i + 1]].
+
+    Words keep short texts from swinging too far on one edit (dropping a
+    word removes one word and two bigrams), bigrams keep word order in play.
+    """
+    tokens, lengths = [], []
+    for text in texts:
+        words = WORD_PATTERN.findall(text.lower())
+        lengths.append(len(words))
+        tokens.extend(words)
+    # Each distinct word is hashed once
+    vocabulary = {token: zlib.crc32(token.encode()) for token in set(tokens)}
+
+    lengths = np.array(lengths, dtype=np.int64)
+    hashes = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+    docs = np.repeat(np.arange(len(texts), dtype=np.uint64), lengths)
+
+    # Bigrams never cross a text boundary
+    same_doc = docs[1:] == docs[:-1]
+    bigrams = (hashes[:-1] * np.uint64(0x9E3779B1) + hashes[1:]) & np.uint64(0xFFFFFFFF)
+    values = np.concatenate([hashes, bigrams[same_doc]])
+    owners = np.concatenate([docs, docs[:-1][same_doc]])
+
+    keys = _sorted_unique((owners << np.uint64(32)) | values)
+    offsets = np.searchsorted(keys >> np.uint64(32), np.arange(len(texts) + 1, dtype=np.uint64))
+    return keys & np.uint64(0xFFFFFFFF), offsets
+
+
+def jaccard(shingles: np.ndarray, offsets: np.ndarray, i: int, j: int) -> float:
+    """Exact Jaccard similarity of two texts' shingle sets"""
+    a = shingles[offsets[i]:offsets[i + 1]]
+    b = shingles[offsets[j]:offsets[j + 1]]
+    if not len(a) or not len(b):
+        return 0.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+class NearDuplicateDetector:
+    """
+    Near-duplicate detection over product text with MinHash and LSH.
+
+    Every text gets a MinHash signature of its shingles; signatures are cut
+    into bands, and texts agreeing on a whole band become candidate pairs, so
+    candidate generation costs one sort per band instead of comparing every
+    pair. Candidates whose signatures already disagree too much are dropped,
+    and the rest are confirmed with the exact shingle Jaccard similarity.
+
+    With the defaults (16 bands of 4), pairs at the 0.75 threshold are
+    candidates with 99.8% probability, pairs at 0.3 with under 13%.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 bands: int = DEDUP_BANDS, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        # Multiply-shift hash functions h(x) = (a * x + b) mod 2**64 >> 32, a odd
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64, endpoint=False)
+
+    def signatures(self, shingles: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """(texts, num_perm) MinHash signatures; texts without shingles get all-max rows"""
+        n = len(offsets) - 1
+        signatures = np.full((n, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        doc = 0
+        while doc < n:
+            # Whole texts per block, at least one even if it alone exceeds the block size
+            end = max(int(np.searchsorted(offsets, offsets[doc] + MINHASH_BLOCK, side="right")) - 1, doc + 1)
+            start = offsets[doc]
+            block = shingles[start:offsets[end]]
+            if len(block):
+                permuted = (block[:, None] * self.a + self.b) >> np.uint64(32)
+                sizes = np.diff(offsets[doc:end + 1])
+                filled = np.flatnonzero(sizes)
+                signatures[doc + filled] = np.minimum.reduceat(permuted, (offsets[doc:end] - start)[filled], axis=0)
+            doc = end
+        return signatures
+
+    def candidate_pairs(self, signatures: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """
+        (pairs, 2) row pairs that share at least one band, lower row first.
+
+        Within each bucket every member is paired with the bucket's first row
+        and with its neighbour, which keeps the pair count linear in bucket
+        size even for very common bands.
+        """
+        rows = np.flatnonzero(valid)
+        width = self.num_perm // self.bands
+        pairs = []
+        for band in range(self.bands):
+            # Band columns folded into one 64-bit key (uint64 arithmetic wraps)
+            keys = np.zeros(len(rows), dtype=np.uint64)
+            for column in signatures[rows, band * width:(band + 1) * width].T:
+                keys = keys * np.uint64(1000003) + column.astype(np.uint64)
+            order = np.argsort(keys, kind="stable")
+            ordered = keys[order]
+            same = np.flatnonzero(ordered[1:] == ordered[:-1]) + 1
+            if not len(same):
+                continue
+            starts = np.arange(len(ordered))
+            starts[same] = 0
+            starts = np.maximum.accumulate(starts)
+            members = rows[order]
+            pairs.append(np.stack([members[same - 1], members[same]], axis=1))
+            pairs.append(np.stack([members[starts[same]], members[same]], axis=1))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(pairs), axis=1)
+        # Pairs de-duplicated as single integers, which sorts far faster than rows
+        n = len(signatures)
+        codes = _sorted_unique(pairs[:, 0] * n + pairs[:, 1])
+        pairs = np.stack([codes // n, codes % n], axis=1)
+        return pairs[pairs[:, 0] != pairs[:, 1]]
+
+    def find(self, texts: List[str], guards: Optional[List[Any]] = None
+             ) -> Tuple[np.ndarray, List[Tuple[int, int, float]], Dict[str, int]]:
+        """
+        Cluster near-duplicate texts.
+
+        guards, when given, must be equal for two texts to be merged whatever
+        their similarity (e.g. the model numbers in product names).
+
+        Returns (representative, merges, counts): representative[i] is the
+        earliest text of i's cluster (i itself when it is unique), merges
+        lists a (kept, dropped, similarity) triple per duplicate.
+        """
+        shingles, offsets = shingle(texts)
+        signatures = self.signatures(shingles, offsets)
+        candidates = self.candidate_pairs(signatures, np.diff(offsets) > 0)
+        counts = {"candidate_pairs": len(candidates)}
+
+        # Cheap pre-filters: guards must match, and the share of equal MinHashes
+        # (an estimate of the Jaccard similarity) must come close to the threshold
+        if guards is not None and len(candidates):
+            codes = {}
+            guard_codes = np.array([codes.setdefault(guard, len(codes)) for guard in guards], dtype=np.int64)
+            candidates = candidates[guard_codes[candidates[:, 0]] == guard_codes[candidates[:, 1]]]
+        if len(candidates):
+            estimates = (signatures[candidates[:, 0]] == signatures[candidates[:, 1]]).mean(axis=1)
+            candidates = candidates[estimates >= self.threshold - ESTIMATE_SLACK]
+        counts["prefiltered_pairs"] = len(candidates)
+
+        parent = list(range(len(texts)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        counts["confirmed_pairs"] = 0
+        for i, j in candidates.tolist():
+            if jaccard(shingles, offsets, i, j) < self.threshold:
+                continue
+            counts["confirmed_pairs"] += 1
+            a, b = root(i), root(j)
+            if a != b:
+                # The earlier text survives
+                parent[max(a, b)] = min(a, b)
+
+        representative = np.array([root(i) for i in range(len(texts))], dtype=np.int64)
+        merges = [(int(kept), dropped, round(jaccard(shingles, offsets, kept, dropped), 4))
+                  for dropped, kept in enumerate(representative) if kept != dropped]
+        return representative, merges, counts
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+
+try:
+    # POSIX advisory locks; without them (Windows) the store is unlocked
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "store.lock"
+
+
+def text_hash(text: str) -> str:
+    """Stable fingerprint of the text a product embedding was computed from"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Flat-file store for the product embedding matrix.
+
+    The matrix lives in a .npy file and is loaded with mmap_mode='r', so every
+    worker process on the host shares the same page-cache pages instead of
+    holding its own copy. A JSON manifest records the model name and, per row,
+    the product id and the hash of the text that was encoded, which lets the
+    caller re-encode only products whose text changed.
+
+    Workers on the host share the directory: writers hold an exclusive lock
+    on a lock file while they replace the store, readers a shared one while
+    they open it, so no worker deletes a matrix another is about to publish
+    or open.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the store's lock file, creating the directory if needed"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self, model_name: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Return (memory-mapped matrix, manifest), or None if missing or stale"""
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with self._locked(exclusive=False):
+                return self._open(model_name)
+        except OSError as e:
+            print(f"Embedding store unavailable, recomputing: {e}")
+            return None
+
+    def _open(self, model_name: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        try:
+            manifest = self._read_manifest()
+            if manifest.get("model") != model_name:
+                return None
+            matrix = np.load(os.path.join(self.directory, manifest["matrix"]), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Embedding store unavailable, recomputing: {e}")
+            return None
+
+        if matrix.ndim != 2 or len(matrix) != len(manifest.get("ids", [])):
+            return None
+        return matrix, manifest
+
+    def save(self, model_name: str, ids: List[int], hashes: List[str],
+             embeddings: np.ndarray) -> np.ndarray:
+        """
+        Persist a new matrix and manifest and return the matrix re-opened as a
+        read-only memory map.
+
+        The matrix gets a unique file name and the manifest is swapped in last
+        with os.replace, so a concurrently starting worker sees either the old
+        store or the new one, never a mix of both. Everything happens under
+        the exclusive lock; if another worker already stored the same
+        products while this one waited, its matrix is reused instead.
+        """
+        with self._locked(exclusive=True):
+            existing = self._open(model_name) if os.path.exists(self.manifest_path) else None
+            if existing is not None:
+                matrix, manifest = existing
+                if (manifest["ids"] == [int(product_id) for product_id in ids] and manifest["hashes"] == list(hashes)
+                        and matrix.shape == embeddings.shape):
+                    return matrix
+            return self._write(model_name, ids, hashes, embeddings)
+
+    def _write(self, model_name: str, ids: List[int], hashes: List[str],
+               embeddings: np.ndarray) -> np.ndarray:
+        os.makedirs(self.directory, exist_ok=True)
+        matrix_name = f"embeddings-{uuid.uuid4().hex}.npy"
+        matrix_path = os.path.join(self.directory, matrix_name)
+        np.save(matrix_path, np.ascontiguousarray(embeddings, dtype=np.float32))
+
+        manifest = {
+            "model": model_name,
+            "dimension": int(embeddings.shape[1]),
+            "matrix": matrix_name,
+            "ids": [int(product_id) for product_id in ids],
+            "hashes": list(hashes),
+        }
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+        self._remove_stale_matrices()
+        return np.load(matrix_path, mmap_mode="r")
+
+    def _remove_stale_matrices(self) -> None:
+        """
+        Delete matrix files the manifest no longer references (open memory
+        maps stay valid on POSIX). Only called under the exclusive lock.
+        """
+        try:
+            keep = self._read_manifest().get("matrix")
+        except (OSError, ValueError):
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith("embeddings-") and name.endswith(".npy") and name != keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -0,0 +1,213 @@
+from typing import Any, Callable, Dict, List, Union
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+
+# "torch" runs SentenceTransformer; "onnx" runs an exported copy through onnxruntime
+ENCODER_BACKENDS = ("torch", "onnx")
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# Dynamic int8 quantization of the ONNX model's weights
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "0") == "1"
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "onnx"),
+)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+# SentenceTransformer truncates all-MiniLM-L6-v2 inputs at 256 word pieces
+MAX_SEQUENCE_LENGTH = 256
+TOKENIZER_FILE = "tokenizer.json"
+ONNX_FILE = "model.onnx"
+QUANTIZED_ONNX_FILE = "model.int8.onnx"
+
+
+def encoder_name(model_name: str, backend: str, quantize: bool = False) -> str:
+    """
+    Name identifying the embedding space an encoder produces; used to key
+    cached query vectors and stored product embeddings.
+    """
+    if backend == "torch":
+        return model_name
+    return f"{model_name}+onnx-int8" if quantize else f"{model_name}+onnx"
+
+
+def _hub_name(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def export_onnx(model_name: str, directory: str) -> str:
+    """
+    Export the transformer behind a sentence-transformers model to ONNX,
+    alongside its tokenizer.json. Needs torch and transformers, but only
+    for the export; returns the path of the .onnx file.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print(f"Exporting {model_name} to ONNX...")
+    tokenizer = AutoTokenizer.from_pretrained(_hub_name(model_name))
+    model = AutoModel.from_pretrained(_hub_name(model_name)).eval()
+    sample = tokenizer(["an example product description"], return_tensors="pt")
+
+    # Written to a temporary directory and moved into place, so a crashed
+    # export never leaves a half-written model behind
+    staging = f"{directory}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                os.path.join(staging, ONNX_FILE),
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic,
+                              "token_type_ids": dynamic, "last_hidden_state": dynamic},
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(staging)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(staging, directory)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return os.path.join(directory, ONNX_FILE)
+
+
+def quantize_onnx(source: str, target: str) -> str:
+    """Dynamic int8 quantization of an ONNX model's weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    staging = f"{target}.tmp-{uuid.uuid4().hex}"
+    try:
+        quantize_dynamic(source, staging, weight_type=QuantType.QInt8)
+        os.replace(staging, target)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    return target
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an ONNX export of a sentence-transformers model
+    through onnxruntime.
+
+    Tokenization uses the model's own tokenizer.json via the tokenizers
+    library, and embeddings are mean-pooled over the attention mask and
+    unit-normalized, the same pipeline as all-MiniLM-L6-v2 under
+    SentenceTransformer, but without importing torch. The model is exported
+    (and quantized) on first use and reused from model_dir afterwards.
+    """
+
+    def __init__(self, model_name: str, model_dir: str = ONNX_MODEL_DIR, quantize: bool = ONNX_QUANTIZE,
+                 threads: int = ONNX_THREADS, max_length: int = MAX_SEQUENCE_LENGTH):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.directory = os.path.join(model_dir, model_name.replace("/", "__"))
+        self.path = self._ensure_model()
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.directory, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def _ensure_model(self) -> str:
+        path = os.path.join(self.directory, ONNX_FILE)
+        if not (os.path.exists(path) and os.path.exists(os.path.join(self.directory, TOKENIZER_FILE))):
+            path = export_onnx(self.model_name, self.directory)
+        if not self.quantize:
+            return path
+        quantized = os.path.join(self.directory, QUANTIZED_ONNX_FILE)
+        if not os.path.exists(quantized):
+            print(f"Quantizing {self.model_name} to int8...")
+            quantize_onnx(path, quantized)
+        return quantized
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Unit-normalized float32 embeddings, one row per sentence"""
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(list(sentences[start:start + batch_size]))
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+            # Mean over real tokens only, as sentence-transformers' Pooling does
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append((pooled / np.clip(norms, 1e-12, None)).astype(np.float32))
+
+        if not batches:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.concatenate(batches)
+
+
+def create_encoder(model_name: str, backend: str = ENCODER_BACKEND, quantize: bool = ONNX_QUANTIZE):
+    """An object with SentenceTransformer's encode(texts) for the given backend"""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+    if backend == "onnx":
+        return OnnxEncoder(model_name, quantize=quantize)
+    # Imported here: torch and sentence-transformers alone take seconds to import
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def check_parity(reference, candidate, texts: List[str]) -> Dict[str, float]:
+    """Cosine agreement between two encoders' embeddings of the same texts"""
+    expected = np.asarray(reference.encode(texts), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts), dtype=np.float32)
+    expected = expected / np.clip(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12, None)
+    actual = actual / np.clip(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12, None)
+    cosine = (expected * actual).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosine.min()), 6),
+        "mean_cosine": round(float(cosine.mean()), 6),
+    }
+
+
+def measure_encoder(encode: Callable[[List[str]], Any], texts: List[str],
+                    batch_size: int = 32, repeat: int = 3) -> Dict[str, float]:
+    """Single-text latency percentiles and batched throughput of an encode function"""
+    encode(texts[:1])
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            encode([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for offset in range(0, len(texts), batch_size):
+            encode(texts[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "throughput_texts_per_second": round(repeat * len(texts) / elapsed, 1),
+    }
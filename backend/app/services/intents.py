@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+# Intent patterns, checked in priority order: the first intent with any
+# matching pattern wins
+INTENT_PATTERNS: List[Tuple[str, List[str]]] = [
+    # Search for products patterns
+    ('product_search', [
+        r'find.*(?:headphones?|earbuds?|speakers?)',
+        r'(?:show|find|search).*(?:laptop|computer|phone)',
+        r'(?:looking for|need|want).*(?:shoes?|sneakers?|boots?)',
+        r'(?:find|show).*(?:under|below|less than).*\$?\d+',
+        r'(?:budget|cheap|affordable).*(?:laptop|phone|headphones?)'
+    ]),
+    # Comparison patterns
+    ('comparison', [
+        r'(?:compare|vs|versus|better|difference)',
+        r'(?:which is better|what.*difference)',
+        r'(?:should i get|choose between)'
+    ]),
+    # Recommendation patterns
+    ('recommendation', [
+        r'(?:recommend|suggest|advice)',
+        r'(?:what should i|help me choose)',
+        r'(?:best.*for|good.*for)'
+    ]),
+    # Question patterns
+    ('question', [
+        r'(?:how much|what.*price|cost)',
+        r'(?:is.*good|worth it|reliable)',
+        r'(?:what.*features|specs|specifications)'
+    ]),
+]
+
+# Budget patterns, in priority order; group 1 is the amount
+BUDGET_PATTERNS = [
+    r'\$(\d+(?:\.\d{2})?)',
+    r'under (\d+)',
+    r'below (\d+)',
+    r'less than (\d+)',
+    r'budget (\d+)'
+]
+
+# Category keywords, in priority order (plain substrings)
+CATEGORY_KEYWORDS = {
+    'electronics': ['phone', 'laptop', 'computer', 'tablet', 'camera', 'headphones', 'speaker'],
+    'clothing': ['shirt', 'pants', 'dress', 'jacket', 'clothes', 'jeans'],
+    'footwear': ['shoes', 'sneakers', 'boots', 'sandals'],
+    'home & kitchen': ['kitchen', 'cooking', 'blender', 'pot', 'appliance'],
+    'furniture': ['chair', 'desk', 'table', 'furniture'],
+    'sports & outdoors': ['fitness', 'exercise', 'outdoor', 'sports']
+}
+
+
+# Compiled once at import. A single regex with one lookahead per pattern
+# was measured slower than this: lookaheads defeat the regex engine's
+# literal-prefix scanning, so each intent instead gets one alternation and
+# the intents are tried in priority order.
+INTENT_MATCHERS = [
+    (intent, re.compile('|'.join(f'(?:{pattern})' for pattern in patterns)))
+    for intent, patterns in INTENT_PATTERNS
+]
+
+# One search tells whether any budget is present at all; only then is the
+# winning pattern resolved in priority order
+BUDGET_ANY = re.compile('|'.join(f'(?:{pattern})' for pattern in BUDGET_PATTERNS))
+BUDGET_MATCHERS = [re.compile(pattern) for pattern in BUDGET_PATTERNS]
+
+# Keyword automaton for categories: a zero-width lookahead reports every
+# keyword occurrence (overlaps included) in one scan, alternatives ordered
+# by category priority
+_CATEGORY_NAMES = list(CATEGORY_KEYWORDS)
+_KEYWORD_RANK = {
+    keyword: rank for rank, keywords in enumerate(CATEGORY_KEYWORDS.values()) for keyword in keywords
+}
+CATEGORY_SCANNER = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in _KEYWORD_RANK) + '))'
+)
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Follow-ups that refer to the previous result set, in priority order
+FOLLOW_UP_PATTERNS = [
+    ('select', r'\b(?:the )?(first|second|third|fourth|last) (?:one|option|item|product)\b'),
+    ('select', r'(?:\bnumber |\boption |#)([1-4])\b'),
+    ('cheaper', r'\b(?:cheaper|less expensive|lower price)'),
+    ('pricier', r'\b(?:pricier|more expensive|higher end|premium)'),
+    ('top_rated', r'\b(?:better|best|highest|top)[- ]rated\b'),
+]
+FOLLOW_UP_MATCHERS = [(action, re.compile(pattern)) for action, pattern in FOLLOW_UP_PATTERNS]
+ORDINALS = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'last': -1}
+
+
+def analyze_message(message: str) -> Dict[str, Any]:
+    """
+    Classify a chat message and extract its budget and category.
+
+    Returns {'type', 'budget', 'category'}; results are identical to running
+    every pattern list with its own re.search in priority order.
+    """
+    message_lower = message.lower()
+
+    intent_type = next(
+        (intent for intent, matcher in INTENT_MATCHERS if matcher.search(message_lower)), 'general'
+    )
+
+    budget: Optional[float] = None
+    if BUDGET_ANY.search(message_lower):
+        for matcher in BUDGET_MATCHERS:
+            match = matcher.search(message_lower)
+            if match:
+                budget = float(match.group(1))
+                break
+
+    ranks = [_KEYWORD_RANK[keyword] for keyword in CATEGORY_SCANNER.findall(message_lower)]
+    category = _CATEGORY_NAMES[min(ranks)] if ranks else None
+
+    return {'type': intent_type, 'budget': budget, 'category': category}
+
+
+def detect_follow_up(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Recognize a follow-up phrase about the previous results ("cheaper ones",
+    "show me the second one"). Returns {'action', 'position', 'rest'} or
+    None; position is the 0-based index for 'select' (-1 for "last"), rest
+    the lowercased message with the phrase cut out, so callers can tell a
+    bare follow-up from a new request that happens to contain the phrase.
+    """
+    message_lower = message.lower()
+    for action, matcher in FOLLOW_UP_MATCHERS:
+        match = matcher.search(message_lower)
+        if match:
+            position = None
+            if action == 'select':
+                word = match.group(1)
+                position = ORDINALS[word] if word in ORDINALS else int(word) - 1
+            rest = f"{message_lower[:match.start()]} {message_lower[match.end():]}"
+            return {'action': action, 'position': position, 'rest': rest}
+    return None
@@ -0,0 +1,240 @@
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+
+try:
+    # C implementation (pyahocorasick, in requirements.txt); without it the
+    # pure-Python automaton or, for small tables, plain substring scans are used
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Extra brand and tag keywords, merged over the built-in tables below when the file exists:
+# {"brands": {"keyword": "Brand"}, "tags": {"tag": ["keyword", ...]}}
+PRODUCT_KEYWORDS_FILE = os.getenv(
+    "PRODUCT_KEYWORDS_FILE",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "keywords.json"),
+)
+
+# Substrings of a lowercased title that identify its brand; the first entry that matches wins
+BRAND_KEYWORDS = {
+    'apple': 'Apple', 'samsung': 'Samsung', 'nike': 'Nike', 'adidas': 'Adidas',
+    'sony': 'Sony', 'hp': 'HP', 'dell': 'Dell', 'lenovo': 'Lenovo',
+    'asus': 'ASUS', 'acer': 'Acer', 'canon': 'Canon', 'nikon': 'Nikon',
+    'bose': 'Bose', 'jbl': 'JBL', 'beats': 'Beats', 'sennheiser': 'Sennheiser'
+}
+
+# Tag -> substrings of the lowercased title, description and category that earn it
+TAG_KEYWORDS = {
+    'wireless': ['wireless', 'bluetooth', 'cordless'],
+    'portable': ['portable', 'compact', 'travel', 'lightweight'],
+    'premium': ['premium', 'luxury', 'high-end', 'professional'],
+    'budget': ['cheap', 'affordable', 'budget', 'value'],
+    'gaming': ['gaming', 'gamer', 'esports', 'rgb'],
+    'fitness': ['fitness', 'sport', 'workout', 'exercise', 'running'],
+    'smart': ['smart', 'ai', 'intelligent', 'connected'],
+    'waterproof': ['waterproof', 'water-resistant', 'splash'],
+    'fast': ['fast', 'quick', 'speed', 'rapid'],
+    'comfortable': ['comfortable', 'soft', 'cozy', 'ergonomic']
+}
+
+MAX_TAGS = 5
+
+# Up to this many keywords, per-keyword substring scans (which run in C) beat
+# the pure-Python automaton; measured crossover is around 250
+SUBSTRING_SCAN_MAX_KEYWORDS = 200
+
+
+def load_keyword_tables(path: Optional[str] = PRODUCT_KEYWORDS_FILE) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Built-in brand and tag tables extended from a JSON file.
+
+    File brands are added after the built-in ones (a repeated keyword takes
+    the file's brand name) and file tags after the built-in tags (a repeated
+    tag gains the extra keywords). Keywords are lowercased, as they are
+    matched against lowercased text.
+    """
+    brands = dict(BRAND_KEYWORDS)
+    tags = {tag: list(keywords) for tag, keywords in TAG_KEYWORDS.items()}
+    if not path or not os.path.exists(path):
+        return brands, tags
+
+    with open(path) as f:
+        tables = json.load(f)
+    for keyword, brand in tables.get('brands', {}).items():
+        brands[keyword.lower()] = brand
+    for tag, keywords in tables.get('tags', {}).items():
+        existing = tags.setdefault(tag, [])
+        existing.extend(keyword.lower() for keyword in keywords if keyword.lower() not in existing)
+    print(f"Loaded {len(tables.get('brands', {}))} brand and {len(tables.get('tags', {}))} tag entries from {path}")
+    return brands, tags
+
+
+class KeywordAutomaton:
+    """
+    Aho–Corasick automaton over a fixed set of keywords, each carrying a payload.
+
+    Scanning a text reports every occurrence of every keyword (overlaps
+    included) in one pass, however many keywords there are. Runs on
+    pyahocorasick when it is installed; otherwise the failure links are
+    folded into a full transition table at build time, so the pure-Python
+    scan is one dict lookup per character.
+    """
+
+    def __init__(self, keywords: Dict[str, Any], native: bool = True):
+        self.native = native and ahocorasick is not None and bool(keywords)
+        if self.native:
+            self.automaton = ahocorasick.Automaton()
+            for keyword, payload in keywords.items():
+                self.automaton.add_word(keyword, payload)
+            self.automaton.make_automaton()
+            return
+
+        # Trie of the keywords; outputs[state] holds the payloads of keywords ending there
+        goto = [{}]
+        outputs = [[]]
+        for keyword, payload in keywords.items():
+            state = 0
+            for char in keyword:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(payload)
+
+        # Breadth-first, so a state's failure target is finished before the state itself
+        fail = [0] * len(goto)
+        transitions = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in transitions[fail[state]].items():
+                transitions[state].setdefault(char, target)
+            for char, child in goto[state].items():
+                if state:
+                    fail[child] = transitions[fail[state]].get(char, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+
+        self.transitions = transitions
+        self.outputs = [tuple(output) for output in outputs]
+
+    def matches(self, text: str) -> List[Tuple[int, Any]]:
+        """(end position, payload) for every keyword occurrence in text"""
+        if self.native:
+            return list(self.automaton.iter(text))
+
+        transitions = self.transitions
+        outputs = self.outputs
+        root = transitions[0]
+        state = 0
+        found = []
+        for position, char in enumerate(text):
+            state = transitions[state].get(char)
+            if state is None:
+                state = root.get(char, 0)
+            for payload in outputs[state]:
+                found.append((position, payload))
+        return found
+
+
+class ProductTagger:
+    """
+    Brand extraction and tagging of product text in one automaton pass.
+
+    Brand and tag keywords share one automaton, run over the lowercased
+    "title description category" text; brand keywords only count when they
+    end within the title. Results follow the table order exactly like the
+    per-keyword substring scans they replace: the earliest brand entry found
+    in the title, and tags in table order.
+
+    Without pyahocorasick, small tables are scanned keyword by keyword
+    instead, which is faster than the automaton in pure Python.
+    """
+
+    def __init__(self, brands: Dict[str, str], tags: Dict[str, List[str]], native: bool = True):
+        self.brand_names = list(brands.values())
+        self.tag_names = list(tags)
+        keyword_count = len(brands) + sum(len(keywords) for keywords in tags.values())
+        self.substring_scan = not (native and ahocorasick is not None) and keyword_count <= SUBSTRING_SCAN_MAX_KEYWORDS
+        if self.substring_scan:
+            self.brand_table = list(brands.items())
+            self.tag_table = [(tag, tuple(keywords)) for tag, keywords in tags.items()]
+            return
+
+        # Keyword -> (brand entry index or None, indices of the tags it earns)
+        keywords = {keyword: (index, frozenset()) for index, keyword in enumerate(brands)}
+        for index, tag_keywords in enumerate(tags.values()):
+            for keyword in tag_keywords:
+                brand, keyword_tags = keywords.get(keyword, (None, frozenset()))
+                keywords[keyword] = (brand, keyword_tags | {index})
+        self.automaton = KeywordAutomaton(keywords, native)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = PRODUCT_KEYWORDS_FILE, native: bool = True) -> "ProductTagger":
+        return cls(*load_keyword_tables(path), native=native)
+
+    def analyze(self, title: str, description: str, category: str) -> Tuple[str, List[str]]:
+        """(brand, tags) of a product"""
+        text = f"{title} {description} {category}".lower()
+        if self.substring_scan:
+            found = [tag for tag, keywords in self.tag_table if any(keyword in text for keyword in keywords)]
+            return self.brand(title), self._with_category(found, category)
+
+        title_lower = title.lower()
+        # Lowercasing is per character but for a word-final sigma, which can
+        # depend on what follows the title
+        title_end = len(title_lower) if text.startswith(title_lower) else -1
+
+        brand = None
+        found_tags = set()
+        for end, (index, keyword_tags) in self.automaton.matches(text):
+            if keyword_tags:
+                found_tags |= keyword_tags
+            if index is not None and end < title_end and (brand is None or index < brand):
+                brand = index
+
+        if title_end < 0:
+            brand_name = self.brand(title)
+        elif brand is None:
+            brand_name = self._fallback_brand(title)
+        else:
+            brand_name = self.brand_names[brand]
+        return brand_name, self._tags(found_tags, category)
+
+    def brand(self, title: str) -> str:
+        """Brand of a product title"""
+        if self.substring_scan:
+            title_lower = title.lower()
+            for keyword, brand_name in self.brand_table:
+                if keyword in title_lower:
+                    return brand_name
+            return self._fallback_brand(title)
+        found = [index for _, (index, _) in self.automaton.matches(title.lower()) if index is not None]
+        brand = min(found, default=None)
+        return self._fallback_brand(title) if brand is None else self.brand_names[brand]
+
+    def tags(self, title: str, description: str, category: str) -> List[str]:
+        """Tags of a product"""
+        return self.analyze(title, description, category)[1]
+
+    @staticmethod
+    def _fallback_brand(title: str) -> str:
+        # Generate brand from first word if no known brand found
+        first_word = title.split()[0] if title.split() else "Generic"
+        return first_word.title()
+
+    def _tags(self, found: set, category: str) -> List[str]:
+        return self._with_category([self.tag_names[index] for index in sorted(found)], category)
+
+    @staticmethod
+    def _with_category(tags: List[str], category: str) -> List[str]:
+        # Add category as tag
+        if category and category.lower() not in [tag.lower() for tag in tags]:
+            tags.append(category.lower().replace(' & ', '-').replace(' ', '-'))
+
+        return tags[:MAX_TAGS]
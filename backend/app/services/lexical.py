@@ -0,0 +1,91 @@
+from typing import List, Optional, Tuple
+import math
+import re
+import numpy as np
+
+# Words, numbers and hyphenated model numbers such as "wh-1000xm5"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of a text.
+
+    Compound tokens like "wh-1000xm5" are kept whole (so exact model numbers
+    match precisely) and also split into their parts ("wh", "1000xm5").
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if '-' in token or '.' in token:
+            tokens.extend(part for part in re.split(r"[-.]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+
+    Each term maps to a posting array of row numbers and a parallel array of
+    precomputed BM25 weights, so scoring a query is a concatenation of a few
+    posting lists plus one bincount, independent of catalog size.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = 0
+        self.postings = {}
+
+    def build(self, texts: List[str]) -> None:
+        term_rows = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_rows.setdefault(token, []).append((row, tf))
+
+        self.size = len(texts)
+        avg_length = float(doc_lengths.mean()) if len(texts) else 0.0
+        self.postings = {}
+        for token, entries in term_rows.items():
+            rows = np.array([row for row, _ in entries], dtype=np.int64)
+            tf = np.array([count for _, count in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[rows] / (avg_length or 1.0))
+            self.postings[token] = (rows, (idf * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32))
+
+    def search(self, query: str, top_k: int,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return (rows, scores, matched term counts) of the best BM25 matches,
+        best first. Rows where mask is False are skipped.
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+        if not terms or top_k <= 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, np.empty(0, dtype=np.float32), empty
+
+        rows = np.concatenate([self.postings[term][0] for term in terms])
+        weights = np.concatenate([self.postings[term][1] for term in terms])
+        if mask is not None:
+            keep = mask[rows]
+            rows, weights = rows[keep], weights[keep]
+
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        matched = np.bincount(inverse)
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return unique_rows[best], scores[best], matched[best]
+
+    def query_terms(self, query: str) -> int:
+        """Number of distinct query terms"""
+        return len(dict.fromkeys(tokenize(query)))
@@ -0,0 +1,257 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+import os
+import threading
+import time
+from starlette.routing import Match
+
+# Set METRICS_ENABLED=0 to turn every timing hook into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Upper bounds in seconds, from 100us (a cached lookup) to 10s (a refresh stage)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram with optional labels, in seconds.
+
+    observe() is a bisect and three additions under a lock; bucket counts are
+    only made cumulative when exposed.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum and count
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class GaugeCallback:
+    """Gauge (or counter) whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.callback():
+            names, values = tuple(labels), tuple(labels.values())
+            lines.append(f"{self.name}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class StageTimer:
+    """
+    Times consecutive stages of one request: each lap(stage) records the time
+    since the previous lap (or since the timer was created).
+    """
+
+    __slots__ = ("histogram", "labels", "last")
+
+    def __init__(self, histogram: Histogram, *labels: str):
+        self.histogram = histogram
+        self.labels = labels
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, *self.labels, stage)
+        self.last = now
+
+    def skip(self) -> None:
+        """Restart the clock without recording (e.g. after work timed elsewhere)"""
+        self.last = time.perf_counter()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def skip(self) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered in the Prometheus text format"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str,
+                       callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+                       kind: str = "gauge") -> GaugeCallback:
+        return self._register(GaugeCallback(name, documentation, callback, kind))
+
+    def timer(self, histogram: Histogram, *labels: str):
+        """A StageTimer, or a shared no-op timer when metrics are disabled"""
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(histogram, *labels)
+
+    def observe(self, histogram: Histogram, value: float, *labels: str) -> None:
+        if self.enabled:
+            histogram.observe(value, *labels)
+
+    def inc(self, counter: Counter, *labels: str, amount: float = 1) -> None:
+        if self.enabled:
+            counter.inc(*labels, amount=amount)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics recorded by the services
+metrics = MetricsRegistry()
+
+SEARCH_STAGE_SECONDS = metrics.histogram(
+    "search_stage_seconds", "Time spent in each stage of search_products", ("mode", "stage"))
+SEARCH_REQUESTS = metrics.counter(
+    "search_requests_total", "search_products calls", ("mode",))
+CHAT_STAGE_SECONDS = metrics.histogram(
+    "chat_stage_seconds", "Time spent classifying and answering chat messages", ("intent", "stage"))
+CHAT_MESSAGES = metrics.counter(
+    "chat_messages_total", "Chat messages handled", ("intent",))
+REFRESH_STAGE_SECONDS = metrics.histogram(
+    "refresh_stage_seconds", "Time spent in each stage of a catalog refresh", ("stage",))
+REFRESHES = metrics.counter(
+    "refreshes_total", "Catalog refreshes", ("outcome",))
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Request latency including response serialization", ("method", "route", "status"))
+
+
+def _route_template(scope) -> str:
+    """Path template of the route a request matches, e.g. /api/products/{product_id}"""
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_SECONDS for every request"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"],
+                                         _route_template(scope), str(status))
@@ -1,7 +1,19 @@
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from app.services.aggregates import CatalogAggregates, ProductChange
+from app.services.batching import EncodingBatcher
+from app.services.embedding_store import EmbeddingStore, text_hash
+from app.services.encoders import ENCODER_BACKEND, ONNX_QUANTIZE, create_encoder, encoder_name
+from app.services.lexical import BM25Index
+from app.services.metrics import (REFRESHES, REFRESH_STAGE_SECONDS, SEARCH_REQUESTS,
+                                  SEARCH_STAGE_SECONDS, metrics)
+from app.services.ttl_cache import TTLCache
+from app.services.scrapper import product_scraper
+from app.services.serialization import dumps, encode_array, extend_object
+from app.services.similar import SIMILAR_PRODUCTS_K, SimilarityGraph, changed_rows
 
 # Sample product data - in a real app this would come from a database
 SAMPLE_PRODUCTS = [
@@ -464,30 +476,981 @@ SAMPLE_PRODUCTS = [
     }
 ]
 
-class ProductSearchService:
+# Sentence transformer used for product and query embeddings
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Directory of the persistent embedding store (set to "" to disable)
+EMBEDDING_STORE_DIR = os.getenv(
+    "EMBEDDING_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "embeddings"),
+)
+
+# Query embedding cache: maximum entries and time-to-live in seconds
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+
+# Micro-batch concurrent query encodes into one model call (off by default)
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "0") == "1"
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "32"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "3"))
+
+# Precision of the first-pass vector scan: "float32" (default), "float16" or "int8"
+EMBEDDING_PRECISIONS = ("float32", "float16", "int8")
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32")
+
+# Retrieval modes accepted by search_products
+SEARCH_MODES = ("semantic", "lexical", "hybrid")
+# Weight of the cosine score in hybrid fusion (the rest goes to BM25)
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+# Each retriever contributes top_k * this many candidates to fusion
+HYBRID_CANDIDATE_FACTOR = 3
+# Top BM25 score must beat the runner-up by this ratio to skip encoding
+LEXICAL_DECISIVE_RATIO = float(os.getenv("LEXICAL_DECISIVE_RATIO", "1.5"))
+
+# /api/products paging: page size when only a cursor is given, and the largest page allowed
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", "48"))
+PRODUCTS_PAGE_MAX = int(os.getenv("PRODUCTS_PAGE_MAX", "500"))
+# Products per chunk of the NDJSON catalog export
+NDJSON_CHUNK_SIZE = int(os.getenv("NDJSON_CHUNK_SIZE", "256"))
+# A failed model warm-up is retried, waiting this long at first and doubling up to the max
+WARMUP_RETRY_DELAY = float(os.getenv("WARMUP_RETRY_DELAY", "5"))
+WARMUP_RETRY_MAX_DELAY = float(os.getenv("WARMUP_RETRY_MAX_DELAY", "300"))
+# Build the "similar products" graph in the background once the model has loaded
+SIMILAR_PRODUCTS_GRAPH = os.getenv("SIMILAR_PRODUCTS_GRAPH", "1") == "1"
+# Most products /api/products/{id}/similar returns; past the graph's k they are ranked exactly
+SIMILAR_PRODUCTS_MAX = int(os.getenv("SIMILAR_PRODUCTS_MAX", "50"))
+
+# Vector index backend used for semantic search: "exact" (default) or "ivf"
+SEARCH_INDEX_BACKEND = os.getenv("SEARCH_INDEX_BACKEND", "exact")
+# Number of IVF lists probed per query (only used by the "ivf" backend)
+SEARCH_IVF_NPROBE = int(os.getenv("SEARCH_IVF_NPROBE", "8"))
+
+
+# Rows upcast to float32 per step of a reduced-precision scan: 6 MB at 384
+# dimensions, and small enough to stay in cache between upcast and matmul
+SCORE_BLOCK_SIZE = 4096
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize embeddings so cosine similarity becomes a dot product"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ReducedPrecisionVectors:
+    """
+    Compact first-pass copy of unit-normalized embeddings.
+
+    "float16" halves the footprint; "int8" stores per-dimension scalar
+    quantized codes (a quarter of float32). Scores are approximate and are
+    meant to pick a shortlist for exact float32 re-ranking.
+
+    Scoring upcasts score_block_size rows at a time into a float32 buffer
+    that each thread allocates once and reuses, so a query never holds more
+    than one small block of float32 rows however large the catalog. The
+    upcast is the price of the smaller footprint: cheap from int8, but
+    several times the exact scan from float16, which NumPy converts without
+    SIMD (compare_index_backends reports the added latency).
+    """
+
+    def __init__(self, embeddings: np.ndarray, precision: str, block_size: int = 65536,
+                 score_block_size: int = SCORE_BLOCK_SIZE):
+        self.precision = precision
+        self.block_size = block_size
+        self.score_block_size = score_block_size
+        self._buffers = threading.local()
+        self.scale = None
+        if precision == "float16":
+            self.data = np.asarray(embeddings, dtype=np.float16)
+        elif precision == "int8":
+            scale = np.abs(embeddings).max(axis=0).astype(np.float32) / 127 if len(embeddings) else np.ones(0, np.float32)
+            scale[scale == 0] = 1.0
+            self.scale = scale
+            self.data = np.empty(embeddings.shape, dtype=np.int8)
+            for start in range(0, len(embeddings), block_size):
+                block = embeddings[start:start + block_size] / scale
+                self.data[start:start + block_size] = np.round(block)
+        else:
+            raise ValueError(f"Unknown embedding precision '{precision}', expected one of {EMBEDDING_PRECISIONS}")
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def _buffer(self) -> np.ndarray:
+        """This thread's float32 upcast buffer"""
+        buffer = getattr(self._buffers, "buffer", None)
+        if buffer is None:
+            buffer = np.empty((self.score_block_size, self.data.shape[1]), dtype=np.float32)
+            self._buffers.buffer = buffer
+        return buffer
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate cosine scores of all rows (or the given ones), upcast block by block"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.scale is not None:
+            query = query * self.scale
+        count = len(self.data) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        buffer = self._buffer()
+        for start in range(0, count, self.score_block_size):
+            end = min(start + self.score_block_size, count)
+            block = self.data[start:end] if rows is None else self.data[rows[start:end]]
+            upcast = buffer[:end - start]
+            np.copyto(upcast, block)
+            np.matmul(upcast, query, out=scores[start:end])
+        return scores
+
+
+class VectorIndex:
+    """
+    Nearest-neighbour index over unit-normalized product embeddings.
+
+    With precision "float16" or "int8" candidates are first scored on a
+    ReducedPrecisionVectors copy, then the best top_k * rerank_factor are
+    re-scored exactly against the float32 embeddings (which can stay a
+    memory-mapped file, of which only the shortlisted rows are touched).
+    """
+
+    name = "base"
+
+    def __init__(self, precision: str = "float32", rerank_factor: int = 4):
+        if precision not in EMBEDDING_PRECISIONS:
+            raise ValueError(f"Unknown embedding precision '{precision}', expected one of {EMBEDDING_PRECISIONS}")
+        self.precision = precision
+        self.rerank_factor = rerank_factor
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self.vectors = None
+
+    def build(self, embeddings: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, top_k: int,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (row indices, cosine scores) of the best matches, best first.
+
+        If mask is given, only rows where it is True are candidates.
+        """
+        raise NotImplementedError
+
+    def memory_bytes(self) -> int:
+        """Bytes scanned in the first pass over the catalog"""
+        return self.vectors.nbytes if self.vectors is not None else self.embeddings.nbytes
+
+    def _set_embeddings(self, embeddings: np.ndarray) -> None:
+        self.embeddings = embeddings
+        if self.precision != "float32":
+            self.vectors = ReducedPrecisionVectors(embeddings, self.precision)
+
+    def _rank(self, query: np.ndarray, top_k: int,
+              candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best top_k among candidate rows (all rows if None), scored exactly"""
+        if self.vectors is None:
+            embeddings = self.embeddings if candidates is None else self.embeddings[candidates]
+            scores = embeddings @ query
+            best = _top_k(scores, top_k)
+            rows = best if candidates is None else candidates[best]
+            return rows, scores[best]
+
+        shortlist = _top_k(self.vectors.scores(query, candidates), top_k * self.rerank_factor)
+        if candidates is not None:
+            shortlist = candidates[shortlist]
+        # Exact float32 re-rank of the shortlist, in row order for sequential reads
+        shortlist = np.sort(shortlist)
+        scores = self.embeddings[shortlist] @ query
+        best = _top_k(scores, top_k)
+        return shortlist[best], scores[best]
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force inner product over the whole matrix - exact results"""
+
+    name = "exact"
+
+    def build(self, embeddings: np.ndarray) -> None:
+        self._set_embeddings(embeddings)
+
+    def search(self, query: np.ndarray, top_k: int,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.embeddings) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Only score the rows that pass the filters
+        candidates = None if mask is None else np.flatnonzero(mask)
+        return self._rank(query, top_k, candidates)
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    Inverted-file index: rows are clustered with spherical k-means and a query
+    only scans the rows of its n_probe closest clusters.
+    """
+
+    name = "ivf"
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8,
+                 n_iter: int = 10, train_size: int = 50000, seed: int = 0, **params):
+        super().__init__(**params)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.empty(0, dtype=np.int64)
+
+    def build(self, embeddings: np.ndarray) -> None:
+        self._set_embeddings(embeddings)
+        n = len(embeddings)
+        if n == 0:
+            return
+
+        n_lists = self.n_lists or int(np.sqrt(n))
+        n_lists = max(1, min(n_lists, n))
+        rng = np.random.default_rng(self.seed)
+
+        # Train centroids on a sample so build time stays bounded
+        sample_size = min(n, max(self.train_size, n_lists))
+        sample = embeddings[np.sort(rng.choice(n, size=sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+            non_empty = counts > 0
+            centroids[non_empty] = _normalize_rows(sums[non_empty])
+
+        assignment = self._assign(embeddings, centroids)
+        self.centroids = centroids
+        self.list_rows = np.argsort(assignment, kind="stable")
+        self.list_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(assignment, minlength=n_lists)))
+        )
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Closest centroid per row, in blocks to bound memory"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start:start + block_size]
+            assignment[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def search(self, query: np.ndarray, top_k: int,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.embeddings) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        probe = _top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([
+            self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe
+        ])
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+            # A selective filter leaves too few rows in the probed lists:
+            # scanning the whole filtered subset is then both cheap and exact
+            if len(candidates) < top_k:
+                candidates = np.flatnonzero(mask)
+        return self._rank(query, top_k, candidates)
+
+    def memory_bytes(self) -> int:
+        return super().memory_bytes() + self.centroids.nbytes + self.list_rows.nbytes
+
+
+INDEX_BACKENDS = {
+    ExactIndex.name: ExactIndex,
+    IVFFlatIndex.name: IVFFlatIndex,
+}
+
+
+def create_index(backend: str, **params) -> VectorIndex:
+    """Instantiate a vector index backend by name"""
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown search index backend '{backend}', expected one of {sorted(INDEX_BACKENDS)}")
+    if backend == IVFFlatIndex.name:
+        params.setdefault("n_probe", SEARCH_IVF_NPROBE)
+    params.setdefault("precision", EMBEDDING_PRECISION)
+    return INDEX_BACKENDS[backend](**params)
+
+
+def compare_index_backends(embeddings: np.ndarray, queries: np.ndarray, top_k: int = 10,
+                           backend: str = "ivf", **params) -> Dict[str, Any]:
+    """
+    Measure recall@k, per-query latency and first-pass memory of a candidate
+    index (an approximate backend and/or reduced precision) against the exact
+    float32 index on the same (unit-normalized) embeddings.
+    """
+    embeddings = _normalize_rows(embeddings)
+    queries = _normalize_rows(queries)
+
+    exact = ExactIndex(precision="float32")
+    exact.build(embeddings)
+    approx = create_index(backend, **params)
+    build_start = time.perf_counter()
+    approx.build(embeddings)
+    build_seconds = time.perf_counter() - build_start
+
+    def run(index: VectorIndex):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            rows, _ = index.search(query, top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(rows)
+        return np.array(latencies), results
+
+    exact_ms, exact_rows = run(exact)
+    approx_ms, approx_rows = run(approx)
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx_rows, exact_rows))
+    expected = sum(len(e) for e in exact_rows)
+
+    def summarize(latencies: np.ndarray) -> Dict[str, float]:
+        return {
+            "mean_ms": round(float(latencies.mean()), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        }
+
+    return {
+        "catalog_size": len(embeddings),
+        "queries": len(queries),
+        "top_k": top_k,
+        "build_seconds": round(build_seconds, 3),
+        f"recall@{top_k}": round(hits / expected, 4) if expected else 1.0,
+        "exact": dict(summarize(exact_ms), memory_bytes=exact.memory_bytes()),
+        "candidate": dict(summarize(approx_ms), memory_bytes=approx.memory_bytes(),
+                          backend=approx.name, precision=approx.precision),
+        "memory_saved_bytes": exact.memory_bytes() - approx.memory_bytes(),
+        # What the saving costs per query (negative when the candidate is faster)
+        "latency_added_p50_ms": round(float(np.percentile(approx_ms, 50) - np.percentile(exact_ms, 50)), 4),
+    }
+
+
+class _Dictionary:
+    """Dictionary encoding for a low-cardinality string column (codes in first-seen order)"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def copy(self) -> "_Dictionary":
+        return _Dictionary(self.values)
+
+
+class ProductCatalog:
+    """
+    Column-oriented product store.
+
+    Numeric fields live in NumPy arrays, category/brand/currency are
+    dictionary-encoded, and free text is kept in plain lists. Product dicts
+    are only materialized (via row/rows) for the rows a response returns.
+
+    Each row's product is also kept JSON-encoded in fragments, so responses
+    can splice bytes instead of serializing dicts. Fragments are encoded when
+    a row is added or changed and shared with merged catalogs otherwise.
+    """
+
     def __init__(self):
-        # Initialize the sentence transformer model for text embeddings
-        print("Loading AI model for semantic search...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.ids = np.empty(0, dtype=np.int64)
+        self.prices = np.empty(0, dtype=np.float64)
+        self.ratings = np.empty(0, dtype=np.float64)
+        self.review_counts = np.empty(0, dtype=np.int64)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.brand_codes = np.empty(0, dtype=np.int32)
+        self.currency_codes = np.empty(0, dtype=np.int32)
+        self.category_dict = _Dictionary()
+        self.brand_dict = _Dictionary()
+        self.currency_dict = _Dictionary()
+        self.names = []
+        self.descriptions = []
+        self.image_urls = []
+        self.tags = []
+        self.fragments = []
+        # Product id -> row position
+        self.row_by_id = {}
+
+    @classmethod
+    def from_products(cls, products: List[Dict[str, Any]]) -> "ProductCatalog":
+        return cls().merge(products)[0]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """Materialize one row as a product dict"""
+        return {
+            "id": int(self.ids[row]),
+            "name": self.names[row],
+            "description": self.descriptions[row],
+            "price": float(self.prices[row]),
+            "currency": self.currency_dict.values[self.currency_codes[row]],
+            "category": self.category_dict.values[self.category_codes[row]],
+            "brand": self.brand_dict.values[self.brand_codes[row]],
+            "image_url": self.image_urls[row],
+            "rating": float(self.ratings[row]),
+            "review_count": int(self.review_counts[row]),
+            "tags": list(self.tags[row]),
+        }
+
+    def rows(self, rows) -> List[Dict[str, Any]]:
+        return [self.row(row) for row in rows]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return self.rows(range(len(self)))
+
+    def encode_rows(self, rows) -> bytes:
+        """JSON array of the given rows' products"""
+        return encode_array(self.fragments[row] for row in rows)
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        row = self.row_by_id.get(product_id)
+        return None if row is None else self.row(row)
+
+    def text(self, row: int) -> str:
+        """Text that a product embedding is computed from"""
+        # Combine name, description, and tags for better search
+        return f"{self.names[row]} {self.descriptions[row]} {' '.join(self.tags[row])}"
+
+    @staticmethod
+    def _counts(codes: np.ndarray, dictionary: _Dictionary) -> Dict[str, int]:
+        counts = np.bincount(codes, minlength=len(dictionary.values))
+        return {value: int(count) for value, count in zip(dictionary.values, counts) if count}
+
+    def category_counts(self) -> Dict[str, int]:
+        """Products per category, in first-seen order"""
+        return self._counts(self.category_codes, self.category_dict)
+
+    def brand_counts(self) -> Dict[str, int]:
+        """Products per brand, in first-seen order"""
+        return self._counts(self.brand_codes, self.brand_dict)
+
+    def filter_mask(self, category: Optional[str] = None, min_price: Optional[float] = None,
+                    max_price: Optional[float] = None) -> Optional[np.ndarray]:
+        """Rows matching the filters, or None when no filter is set"""
+        if not category and min_price is None and max_price is None:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        if category:
+            category = category.lower()
+            codes = [code for code, name in enumerate(self.category_dict.values) if name.lower() == category]
+            mask &= np.isin(self.category_codes, codes)
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        return mask
+
+    def merge(self, products: List[Dict[str, Any]]) -> Tuple["ProductCatalog", List[ProductChange]]:
+        """
+        Return (new catalog, changes) with products upserted by id.
+
+        changes lists an (old, new) product pair per added (old is None) or
+        modified row; unchanged products are not reported.
+
+        Existing rows keep their position and new products are appended, so
+        row numbers from this catalog stay valid in the merged one. The
+        current catalog is left untouched.
+        """
+        updates = {}
+        for product in products:
+            updates[product['id']] = product
+        appended = [product for product_id, product in updates.items() if product_id not in self.row_by_id]
+        n_old = len(self)
+        n = n_old + len(appended)
+
+        catalog = ProductCatalog()
+        catalog.category_dict = self.category_dict.copy()
+        catalog.brand_dict = self.brand_dict.copy()
+        catalog.currency_dict = self.currency_dict.copy()
+        for name in ("ids", "prices", "ratings", "review_counts",
+                     "category_codes", "brand_codes", "currency_codes"):
+            column = getattr(self, name)
+            resized = np.empty(n, dtype=column.dtype)
+            resized[:n_old] = column
+            setattr(catalog, name, resized)
+        catalog.names = self.names + [p['name'] for p in appended]
+        catalog.descriptions = self.descriptions + [p['description'] for p in appended]
+        catalog.image_urls = self.image_urls + [p['image_url'] for p in appended]
+        catalog.tags = self.tags + [tuple(p['tags']) for p in appended]
+        catalog.fragments = list(self.fragments)
+        catalog.row_by_id = dict(self.row_by_id)
+
+        # Appended rows are written column by column
+        if appended:
+            catalog.ids[n_old:] = [p['id'] for p in appended]
+            catalog.prices[n_old:] = [p['price'] for p in appended]
+            catalog.ratings[n_old:] = [p.get('rating', 0) for p in appended]
+            catalog.review_counts[n_old:] = [p.get('review_count', 0) for p in appended]
+            catalog.category_codes[n_old:] = [catalog.category_dict.encode(p['category']) for p in appended]
+            catalog.brand_codes[n_old:] = [catalog.brand_dict.encode(p['brand']) for p in appended]
+            catalog.currency_codes[n_old:] = [catalog.currency_dict.encode(p.get('currency', 'USD')) for p in appended]
+            for offset, product in enumerate(appended):
+                catalog.row_by_id[product['id']] = n_old + offset
+            catalog.fragments.extend(dumps(catalog.row(row)) for row in range(n_old, n))
+
+        changes = [(None, product) for product in appended]
+
+        # Changed existing rows are overwritten in place in the copy
+        for product_id, product in updates.items():
+            row = self.row_by_id.get(product_id)
+            if row is None:
+                continue
+            existing = self.row(row)
+            if existing == product:
+                continue
+            changes.append((existing, product))
+            catalog._assign(row, product)
+
+        return catalog, changes
+
+    def _assign(self, row: int, product: Dict[str, Any]) -> None:
+        self.prices[row] = product['price']
+        self.ratings[row] = product.get('rating', 0)
+        self.review_counts[row] = product.get('review_count', 0)
+        self.category_codes[row] = self.category_dict.encode(product['category'])
+        self.brand_codes[row] = self.brand_dict.encode(product['brand'])
+        self.currency_codes[row] = self.currency_dict.encode(product.get('currency', 'USD'))
+        self.names[row] = product['name']
+        self.descriptions[row] = product['description']
+        self.image_urls[row] = product['image_url']
+        self.tags[row] = tuple(product['tags'])
+        self.fragments[row] = dumps(self.row(row))
+
+
+class CatalogSnapshot:
+    """
+    Product catalog together with its embeddings and vector index.
+
+    A snapshot is never mutated after it is built; refresh_products builds a
+    new one and swaps the reference, so readers that grabbed a snapshot keep a
+    consistent view for the whole request.
+
+    Until the embedding model has loaded, snapshots are lexical-only:
+    embeddings and index are None and searches fall back to BM25. version is
+    the catalog version: it goes up by one whenever the products change, so
+    anything derived from the catalog can be cached against it.
+
+    similar is the precomputed neighbour graph over the embeddings, None
+    until the background build has produced one.
+    """
+
+    def __init__(self, catalog: ProductCatalog, hashes: List[str], embeddings: Optional[np.ndarray],
+                 index: Optional[VectorIndex], lexical: BM25Index, aggregates: CatalogAggregates,
+                 similar: Optional[SimilarityGraph] = None):
+        self.catalog = catalog
+        self.hashes = hashes
+        self.embeddings = embeddings
+        self.index = index
+        self.lexical = lexical
+        self.aggregates = aggregates
+        self.similar = similar
+        self.version = 0
+
+    def with_similar(self, similar: SimilarityGraph) -> "CatalogSnapshot":
+        """The same snapshot with a neighbour graph attached"""
+        return CatalogSnapshot(self.catalog, self.hashes, self.embeddings, self.index, self.lexical,
+                               self.aggregates, similar)
+
+
+class ProductSearchService:
+    def __init__(self, index_backend: Optional[str] = None, store_dir: Optional[str] = None,
+                 precision: Optional[str] = None, encoder_backend: Optional[str] = None,
+                 quantize_encoder: Optional[bool] = None):
+        # The embedding model is loaded by warm_up(), off the import path;
+        # until then searches are served by the lexical index alone
+        self.encoder_backend = encoder_backend or ENCODER_BACKEND
+        self.quantize_encoder = ONNX_QUANTIZE if quantize_encoder is None else quantize_encoder
+        # Names the embedding space, so ONNX and torch vectors never share a cache
+        self.model_name = encoder_name(MODEL_NAME, self.encoder_backend, self.quantize_encoder)
+        self.model = None
+        self.query_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self.batcher = (
+            EncodingBatcher(lambda texts: self.model.encode(texts), QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS)
+            if QUERY_BATCHING else None
+        )
+        self.index_backend = index_backend or SEARCH_INDEX_BACKEND
+        self.precision = precision or EMBEDDING_PRECISION
+
+        # Embeddings are persisted so restarts and sibling workers can reuse them
+        store_dir = EMBEDDING_STORE_DIR if store_dir is None else store_dir
+        self.embedding_store = EmbeddingStore(store_dir) if store_dir else None
+
+        # Only one refresh may rebuild the catalog at a time
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread_lock = threading.Lock()
+        self._refresh_thread = None
+        self._refresh_status = {"state": "idle"}
+        self._warmup_thread_lock = threading.Lock()
+        self._warmup_thread = None
+        self._warmup_status = {"state": "pending"}
+        self._similar_thread_lock = threading.Lock()
+        self._similar_thread = None
+        self._similar_status = {"state": "pending"}
+        self._ready = threading.Event()
         
-        # Precompute embeddings for all products
-        self.products = SAMPLE_PRODUCTS
-        self.product_embeddings = self._compute_product_embeddings()
-        print(f"AI search ready! Loaded {len(self.products)} products.")
+        # Lexical-only until warm_up() has embedded and indexed the catalog
+        self._snapshot = None
+        self._publish(self._build_snapshot(ProductCatalog.from_products(SAMPLE_PRODUCTS)))
+
+    @property
+    def ready(self) -> bool:
+        """True once the model is loaded and the catalog has a vector index"""
+        return self._ready.is_set()
+
+    def warm_up(self) -> None:
+        """
+        Load the embedding model and embed and index the catalog. Blocks until
+        done; does nothing if the service is already ready.
+        """
+        if self.ready:
+            return
+        print(f"Loading AI model for semantic search ({self.model_name})...")
+        model = create_encoder(MODEL_NAME, self.encoder_backend, self.quantize_encoder)
+        with self._refresh_lock:
+            if self.model is None:
+                self.model = model
+                self._publish(self._build_snapshot(self.catalog, previous=self._snapshot), catalog_changed=False)
+        self._ready.set()
+        print(f"AI search ready! Loaded {len(self.catalog)} products ({self.index_backend} index, {self.precision}).")
+
+    def start_warmup(self) -> bool:
+        """Run warm_up on a background thread; False if it already ran or is running"""
+        with self._warmup_thread_lock:
+            if self.ready or (self._warmup_thread is not None and self._warmup_thread.is_alive()):
+                return False
+            self._warmup_status = {"state": "loading", "started_at": time.time()}
+            self._warmup_thread = threading.Thread(target=self._run_warmup, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+            return True
+
+    def _run_warmup(self) -> None:
+        """Warm up, retrying with exponential backoff until the model loads"""
+        status = dict(self._warmup_status, attempts=0)
+        delay = WARMUP_RETRY_DELAY
+        while True:
+            status["attempts"] += 1
+            try:
+                self.warm_up()
+                status["state"] = "ready"
+                status.pop("error", None)
+                status.pop("retry_at", None)
+                break
+            except Exception as e:
+                print(f"❌ Model warm-up failed (attempt {status['attempts']}), retrying in {delay:g}s: {e}")
+                status.update(state="retrying", error=str(e), retry_at=time.time() + delay)
+                self._warmup_status = dict(status)
+                time.sleep(delay)
+                delay = min(delay * 2, WARMUP_RETRY_MAX_DELAY)
+                status["state"] = "loading"
+                self._warmup_status = dict(status)
+        status["finished_at"] = time.time()
+        status["seconds"] = round(status["finished_at"] - status["started_at"], 3)
+        self._warmup_status = status
+        if self.ready and SIMILAR_PRODUCTS_GRAPH:
+            self.start_similarity_build()
+
+    def warmup_status(self) -> Dict[str, Any]:
+        status = dict(self._warmup_status)
+        if self.ready:
+            status["state"] = "ready"
+        return status
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def build_similarity_graph(self) -> SimilarityGraph:
+        """
+        Compute the neighbour graph of the live catalog and attach it.
+
+        The full build runs without the refresh lock, so refreshes and
+        searches carry on meanwhile; snapshots published in the meantime are
+        caught up incrementally before the graph goes live. From then on each
+        refresh updates the graph for the products it changed.
+        """
+        snapshot = self._snapshot
+        if snapshot.embeddings is None:
+            raise RuntimeError("The catalog has no embeddings yet; call warm_up() first")
+        graph = SimilarityGraph.build(snapshot.embeddings)
+        with self._refresh_lock:
+            current = self._snapshot
+            if current.embeddings is None:
+                raise RuntimeError("The catalog lost its embeddings while the graph was built")
+            if current is not snapshot:
+                graph = graph.updated(current.embeddings, changed_rows(snapshot.embeddings, current.embeddings))
+            self._publish(current.with_similar(graph), catalog_changed=False)
+        return graph
+
+    def start_similarity_build(self) -> bool:
+        """Run build_similarity_graph on a background thread; False if one is already running"""
+        with self._similar_thread_lock:
+            if self._similar_thread is not None and self._similar_thread.is_alive():
+                return False
+            self._similar_status = {"state": "building", "started_at": time.time()}
+            self._similar_thread = threading.Thread(target=self._run_similarity_build, name="similar-products",
+                                                    daemon=True)
+            self._similar_thread.start()
+            return True
+
+    def _run_similarity_build(self) -> None:
+        status = dict(self._similar_status)
+        try:
+            graph = self.build_similarity_graph()
+            status.update(graph.stats(), state="ready")
+            print(f"Similar products ready: {len(graph)} products x {graph.k} neighbours "
+                  f"({graph.memory_bytes() / 1e6:.1f} MB)")
+        except Exception as e:
+            print(f"❌ Similar products build failed: {e}")
+            status.update(state="failed", error=str(e))
+        status["finished_at"] = time.time()
+        status["seconds"] = round(status["finished_at"] - status["started_at"], 3)
+        self._similar_status = status
+
+    def similarity_status(self) -> Dict[str, Any]:
+        """State of the neighbour graph build, with the live graph's size once there is one"""
+        status = dict(self._similar_status)
+        similar = self._snapshot.similar
+        if similar is not None:
+            status.update(similar.stats())
+        return status
+
+    @property
+    def catalog(self) -> ProductCatalog:
+        return self._snapshot.catalog
+
+    @property
+    def catalog_version(self) -> int:
+        """Bumped by every change to the catalog's products"""
+        return self._snapshot.version
+
+    def _publish(self, snapshot: CatalogSnapshot, catalog_changed: bool = True) -> None:
+        """Make a snapshot live, bumping the catalog version if its products changed"""
+        current = self._snapshot
+        if current is None:
+            snapshot.version = 1
+        else:
+            snapshot.version = current.version + 1 if catalog_changed else current.version
+        self._snapshot = snapshot
+
+    @property
+    def aggregates(self) -> CatalogAggregates:
+        return self._snapshot.aggregates
+
+    @property
+    def product_embeddings(self) -> np.ndarray:
+        return self._snapshot.embeddings
+
+    @property
+    def index(self) -> VectorIndex:
+        return self._snapshot.index
+
+    def set_model(self, model, model_name: str) -> None:
+        """Swap the embedding model and re-embed the catalog with it"""
+        with self._refresh_lock:
+            self.model = model
+            self.model_name = model_name
+            # Cached query vectors belong to the old model's embedding space
+            self.query_cache.clear()
+            self._publish(self._build_snapshot(self.catalog), catalog_changed=False)
+        self._ready.set()
+
+    def load_products(self, products: List[Dict[str, Any]]) -> None:
+        """Replace the whole catalog with the given products and re-index it"""
+        with self._refresh_lock:
+            self._publish(self._build_snapshot(ProductCatalog.from_products(products)))
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        # MiniLM's tokenizer is uncased, so case and spacing don't change the vector
+        return ' '.join(query.lower().split())
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Unit-normalized query embedding, served from the cache when possible"""
+        key = (self.model_name, self._normalize_query(query))
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            if self.batcher is not None:
+                embedding = _normalize_rows(self.batcher.encode(key[1]))[0]
+            else:
+                embedding = _normalize_rows(self.model.encode([key[1]]))[0]
+            embedding.setflags(write=False)
+            self.query_cache.put(key, embedding)
+        return embedding
+
+    def _build_snapshot(self, catalog: ProductCatalog, previous: Optional[CatalogSnapshot] = None,
+                        changes: Optional[List[ProductChange]] = None) -> CatalogSnapshot:
+        """
+        Embed and index a catalog without touching the live one.
+
+        When the changes since the previous snapshot are known, the catalog
+        aggregates are updated from them instead of being recomputed, and a
+        neighbour graph is carried over by updating the rows whose embedding
+        changed. Without a model the snapshot is lexical-only.
+        """
+        texts = [catalog.text(row) for row in range(len(catalog))]
+        hashes = [text_hash(text) for text in texts]
+        embeddings, index = None, None
+        if self.model is not None:
+            embeddings = self._compute_product_embeddings(catalog, hashes, previous)
+            index = create_index(self.index_backend, precision=self.precision)
+            index.build(embeddings)
+        lexical = BM25Index()
+        lexical.build(texts)
+        if previous is not None and changes is not None:
+            aggregates = previous.aggregates.copy().apply(changes)
+        else:
+            aggregates = CatalogAggregates.from_catalog(catalog)
+        similar = None
+        if embeddings is not None and previous is not None and previous.similar is not None:
+            similar = previous.similar.updated(embeddings, changed_rows(previous.embeddings, embeddings))
+        return CatalogSnapshot(catalog, hashes, embeddings, index, lexical, aggregates, similar)
     
-    def _compute_product_embeddings(self):
-        """Precompute embeddings for all products"""
-        product_texts = []
-        for product in self.products:
-            # Combine name, description, and tags for better search
-            text = f"{product['name']} {product['description']} {' '.join(product['tags'])}"
-            product_texts.append(text)
-        
-        # Generate embeddings
-        embeddings = self.model.encode(product_texts)
-        return embeddings
+    def _compute_product_embeddings(self, catalog: ProductCatalog, hashes: List[str],
+                                    previous: Optional[CatalogSnapshot] = None) -> np.ndarray:
+        """
+        Unit-normalized embeddings for all products.
+
+        Rows whose product text is unchanged are reused from the previous
+        snapshot (or the embedding store on startup); only new or edited
+        products go through the model.
+        """
+        ids = catalog.ids.tolist()
+
+        if previous is not None and previous.embeddings is not None:
+            matrix, cached_ids, cached_hashes = previous.embeddings, previous.catalog.ids.tolist(), previous.hashes
+        else:
+            cached = self.embedding_store.load(self.model_name) if self.embedding_store else None
+            if cached is not None:
+                matrix, manifest = cached
+                if manifest['ids'] == ids and manifest['hashes'] == hashes:
+                    print(f"Loaded {len(ids)} product embeddings from {self.embedding_store.directory}")
+                    return matrix
+                cached_ids, cached_hashes = manifest['ids'], manifest['hashes']
+            else:
+                matrix, cached_ids, cached_hashes = None, [], []
+        cached_rows = {key: row for row, key in enumerate(zip(cached_ids, cached_hashes))}
+
+        reused = [(i, cached_rows[key]) for i, key in enumerate(zip(ids, hashes)) if key in cached_rows]
+        missing = [i for i, key in enumerate(zip(ids, hashes)) if key not in cached_rows]
+
+        # Generate embeddings for new or changed products only
+        if missing:
+            encoded = self.model.encode([catalog.text(i) for i in missing])
+        dimension = matrix.shape[1] if matrix is not None else encoded.shape[1]
+        embeddings = np.empty((len(ids), dimension), dtype=np.float32)
+        if reused:
+            targets, sources = zip(*reused)
+            embeddings[list(targets)] = matrix[list(sources)]
+        if missing:
+            embeddings[missing] = _normalize_rows(encoded)
+        print(f"Encoded {len(missing)} products, reused {len(reused)} cached embeddings")
+
+        if self.embedding_store is None:
+            return embeddings
+        try:
+            return self.embedding_store.save(self.model_name, ids, hashes, embeddings)
+        except OSError as e:
+            print(f"Could not persist embeddings: {e}")
+            return embeddings
+
+    def refresh_products(self) -> Dict[str, Any]:
+        """
+        Merge freshly scraped products into the catalog by id.
+
+        Only new or changed products are re-embedded. The new catalog is built
+        off to the side and swapped in with a single reference assignment, so
+        concurrent searches see either the old catalog or the new one. The
+        scrape runs before the refresh lock is taken, so slow sources never
+        hold up a warm-up, a model swap or the similar-products graph.
+        """
+        timer = metrics.timer(REFRESH_STAGE_SECONDS)
+        try:
+            scraped = product_scraper.get_all_real_products()
+        except Exception:
+            metrics.inc(REFRESHES, "failed")
+            raise
+        timer.lap("scrape")
+
+        with self._refresh_lock:
+            timer.lap("lock_wait")
+            try:
+                current = self._snapshot
+                catalog, changes = current.catalog.merge(scraped)
+                timer.lap("merge")
+                snapshot = self._build_snapshot(catalog, previous=current, changes=changes)
+                timer.lap("index")
+            except Exception:
+                metrics.inc(REFRESHES, "failed")
+                raise
+
+            # Cheap next to the re-embedding: make sure incremental stats didn't drift
+            mismatches = snapshot.aggregates.verify(catalog)
+            if mismatches:
+                print(f"⚠️ Catalog aggregates drifted ({'; '.join(mismatches)}), recomputing")
+                snapshot.aggregates = CatalogAggregates.from_catalog(catalog)
+            timer.lap("verify")
+
+            self._publish(snapshot, catalog_changed=bool(changes))
+            metrics.inc(REFRESHES, "succeeded")
+            added = sum(1 for old, _ in changes if old is None)
+            return {
+                "scraped": len(scraped),
+                "added": added,
+                "updated": len(changes) - added,
+                "total_products": len(catalog),
+                "aggregates_consistent": not mismatches,
+                "deduplication": product_scraper.dedup_summary(),
+            }
+
+    def start_refresh(self) -> bool:
+        """Run refresh_products on a background thread; False if one is already running"""
+        with self._refresh_thread_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_status = {"state": "running", "started_at": time.time()}
+            self._refresh_thread = threading.Thread(target=self._run_refresh, name="product-refresh", daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def _run_refresh(self) -> None:
+        status = dict(self._refresh_status)
+        try:
+            status.update(self.refresh_products(), state="succeeded")
+        except Exception as e:
+            print(f"❌ Product refresh failed: {e}")
+            status.update(state="failed", error=str(e))
+        status["finished_at"] = time.time()
+        self._refresh_status = status
+
+    def refresh_status(self) -> Dict[str, Any]:
+        """State of the most recent background refresh"""
+        return dict(self._refresh_status)
     
-    def search_products(self, query: str, top_k: int = 8, min_score: float = 0.1) -> List[Dict[str, Any]]:
+    def search_products(self, query: str, top_k: int = 8, min_score: float = 0.1,
+                        category: Optional[str] = None, min_price: Optional[float] = None,
+                        max_price: Optional[float] = None, mode: str = "semantic") -> List[Dict[str, Any]]:
         """
         Semantic search using AI embeddings
         
@@ -495,65 +1458,250 @@ class ProductSearchService:
             query: User search query (e.g., "comfortable running shoes")
             top_k: Number of results to return
             min_score: Minimum similarity score (0-1)
+            category: Only return products in this category (case-insensitive)
+            min_price: Only return products priced at least this much
+            max_price: Only return products priced at most this much
+            mode: "semantic" (embeddings only), "lexical" (BM25 only) or
+                "hybrid" (both, fused; skips encoding when BM25 is decisive)
         
         Returns:
             List of products with similarity scores
         """
+        return self._search(self._results, query, top_k, min_score, category, min_price, max_price, mode)
+
+    def search_fragments(self, query: str, top_k: int = 8, min_score: float = 0.1,
+                         category: Optional[str] = None, min_price: Optional[float] = None,
+                         max_price: Optional[float] = None, mode: str = "semantic") -> List[bytes]:
+        """search_products, but each result comes back as its encoded JSON object"""
+        return self._search(self._fragments, query, top_k, min_score, category, min_price, max_price, mode)
+
+    def _search(self, materialize, query: str, top_k: int, min_score: float, category: Optional[str],
+                min_price: Optional[float], max_price: Optional[float], mode: str) -> List[Any]:
+        """Rank rows for a search and hand them to materialize(catalog, rows, scores)"""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+        # Hold one snapshot for the whole query in case a refresh swaps it
+        snapshot = self._snapshot
+
+        # Until the model is warm, semantic and hybrid searches fall back to keywords
+        if snapshot.index is None:
+            mode = "lexical"
+
+        metrics.inc(SEARCH_REQUESTS, mode)
+        timer = metrics.timer(SEARCH_STAGE_SECONDS, mode)
+
+        # Filters are applied before ranking so top_k is filled from matching rows
+        catalog = snapshot.catalog
+        mask = catalog.filter_mask(category, min_price, max_price)
+        timer.lap("filter")
         if not query.strip():
-            return self.products[:top_k]
+            if mask is None:
+                return materialize(catalog, range(min(top_k, len(catalog))), None)
+            return materialize(catalog, np.flatnonzero(mask)[:top_k], None)
+        if mask is not None and not mask.any():
+            return []
+
+        if mode != "semantic":
+            candidates = top_k if mode == "lexical" else top_k * HYBRID_CANDIDATE_FACTOR
+            lexical_rows, lexical_scores, matched = snapshot.lexical.search(query, candidates, mask)
+            timer.lap("lexical")
+            if mode == "lexical" or self._is_decisive(snapshot.lexical, query, lexical_scores, matched):
+                # Scores relative to the best lexical match, so the top hit reads as 1.0
+                scores = lexical_scores / lexical_scores[0] if len(lexical_scores) else lexical_scores
+                rows, scores = self._above(lexical_rows[:top_k], scores[:top_k], min_score)
+                results = materialize(catalog, rows, scores)
+                timer.lap("materialize")
+                return results
         
         # Encode the search query
-        query_embedding = self.model.encode([query])
-        
-        # Calculate similarity scores
-        similarities = cosine_similarity(query_embedding, self.product_embeddings)[0]
-        
-        # Get top results
-        product_scores = list(zip(self.products, similarities))
-        
-        # Filter by minimum score and sort by similarity
-        filtered_results = [
-            (product, float(score)) for product, score in product_scores 
-            if score >= min_score
-        ]
+        query_embedding = self.encode_query(query)
+        timer.lap("encode")
         
-        # Sort by similarity score (highest first)
-        filtered_results.sort(key=lambda x: x[1], reverse=True)
+        # Top k nearest products by cosine similarity, best first
+        if mode == "semantic":
+            rows, scores = snapshot.index.search(query_embedding, top_k, mask)
+            timer.lap("rank")
+        else:
+            rows, scores = snapshot.index.search(query_embedding, top_k * HYBRID_CANDIDATE_FACTOR, mask)
+            timer.lap("rank")
+            rows, scores = self._fuse(snapshot, query_embedding, rows, lexical_rows, lexical_scores, top_k)
+            timer.lap("fuse")
         
-        # Return top k results with scores
+        rows, scores = self._above(rows, scores, min_score)
+        results = materialize(catalog, rows, scores)
+        timer.lap("materialize")
+        return results
+
+    @staticmethod
+    def _above(rows: np.ndarray, scores: np.ndarray, min_score: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Leading ranked rows scoring at least min_score"""
+        below = np.flatnonzero(scores < min_score)
+        end = below[0] if len(below) else len(scores)
+        return rows[:end], scores[:end]
+
+    @staticmethod
+    def _results(catalog: ProductCatalog, rows, scores: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        """Product dicts for ranked rows, with similarity scores when there are any"""
+        if scores is None:
+            return catalog.rows(rows)
         results = []
-        for product, score in filtered_results[:top_k]:
-            result = product.copy()
-            result['similarity_score'] = score
+        for row, score in zip(rows, scores):
+            result = catalog.row(row)
+            result['similarity_score'] = float(score)
             results.append(result)
-        
         return results
+
+    @staticmethod
+    def _fragments(catalog: ProductCatalog, rows, scores: Optional[np.ndarray]) -> List[bytes]:
+        """Encoded products for ranked rows, with similarity scores spliced in"""
+        fragments = catalog.fragments
+        if scores is None:
+            return [fragments[row] for row in rows]
+        return [extend_object(fragments[row], similarity_score=float(score)) for row, score in zip(rows, scores)]
+
+    @staticmethod
+    def _is_decisive(lexical: BM25Index, query: str, scores: np.ndarray, matched: np.ndarray) -> bool:
+        """
+        A lexical hit is decisive when the best product contains every query
+        term (e.g. an exact model number) and clearly outscores the runner-up.
+        """
+        if not len(scores) or matched[0] < lexical.query_terms(query):
+            return False
+        return len(scores) == 1 or scores[0] >= LEXICAL_DECISIVE_RATIO * scores[1]
+
+    @staticmethod
+    def _fuse(snapshot: CatalogSnapshot, query_embedding: np.ndarray,
+              semantic_rows: np.ndarray, lexical_rows: np.ndarray, lexical_scores: np.ndarray,
+              top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Blend exact cosine and max-normalized BM25 over both candidate sets"""
+        rows = np.union1d(semantic_rows, lexical_rows)
+        cosine = snapshot.embeddings[rows] @ query_embedding
+        lexical = np.zeros(len(rows), dtype=np.float32)
+        if len(lexical_scores):
+            lexical[np.searchsorted(rows, lexical_rows)] = lexical_scores / lexical_scores[0]
+        fused = HYBRID_ALPHA * cosine + (1 - HYBRID_ALPHA) * lexical
+        best = _top_k(fused, top_k)
+        return rows[best], fused[best]
+
+    def evaluate_index(self, queries: List[str], top_k: int = 10, backend: str = "ivf", **params) -> Dict[str, Any]:
+        """
+        Report recall@k, latency and memory of an index configuration against
+        exact float32 search on this catalog, e.g. backend="exact", precision="int8"
+        """
+        self.warm_up()
+        query_embeddings = self.model.encode(queries)
+        return compare_index_backends(self.product_embeddings, query_embeddings, top_k, backend, **params)
     
     def get_all_products(self) -> List[Dict[str, Any]]:
         """Get all products"""
-        return self.products
+        return self.catalog.to_dicts()
     
     def get_product_by_id(self, product_id: int) -> Dict[str, Any]:
         """Get a specific product by ID"""
-        for product in self.products:
-            if product['id'] == product_id:
-                return product
-        return None
+        return self.catalog.get(product_id)
     
+    def get_products_by_ids(self, product_ids: List[int]) -> List[Dict[str, Any]]:
+        """Get several products by ID in request order, skipping unknown IDs"""
+        catalog = self.catalog
+        return catalog.rows(self._rows_by_ids(catalog, product_ids))
+
+    def encode_products(self, product_ids: Optional[List[int]] = None) -> bytes:
+        """JSON array of all products, or of the given IDs in request order (unknown IDs skipped)"""
+        catalog = self.catalog
+        if product_ids is None:
+            return encode_array(catalog.fragments)
+        return catalog.encode_rows(self._rows_by_ids(catalog, product_ids))
+
+    def encode_product(self, product_id: int) -> Optional[bytes]:
+        """A product's JSON object, or None for an unknown ID"""
+        catalog = self.catalog
+        row = catalog.row_by_id.get(product_id)
+        return None if row is None else catalog.fragments[row]
+
+    def products_page(self, start: int, limit: int) -> Tuple[List[bytes], Optional[int]]:
+        """
+        Encoded products of up to limit rows from row start on, and the row
+        the next page starts at (None on the last page).
+
+        Merges only ever append rows, so a start row handed out as a cursor
+        stays valid, and pages never skip or repeat products, across refreshes.
+        """
+        fragments = self.catalog.fragments
+        end = min(start + limit, len(fragments))
+        return fragments[start:end], (end if end < len(fragments) else None)
+
+    def export_ndjson(self, start: int = 0, chunk_size: int = NDJSON_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        The catalog from row start on as newline-delimited JSON, one product
+        per line, yielded chunk_size lines at a time.
+
+        The whole export reads the catalog that was live when it began, and
+        only one chunk is ever held beyond the catalog's own fragments.
+        """
+        fragments = self.catalog.fragments
+        for offset in range(start, len(fragments), chunk_size):
+            yield b"\n".join(fragments[offset:offset + chunk_size]) + b"\n"
+
+    def similar_fragments(self, product_id: int, limit: int = SIMILAR_PRODUCTS_K
+                          ) -> Optional[Tuple[List[bytes], str]]:
+        """
+        Encoded products most similar to a product, best first, and where
+        they came from; None for an unknown ID.
+
+        "graph" results are read off the precomputed neighbour lists. Before
+        the graph is built (or past its k) they are ranked exactly against
+        every embedding, and before the model has loaded the product's name is
+        run as a keyword query.
+        """
+        snapshot = self._snapshot
+        catalog = snapshot.catalog
+        row = catalog.row_by_id.get(product_id)
+        if row is None:
+            return None
+        if snapshot.similar is not None and limit <= snapshot.similar.k:
+            rows, scores = snapshot.similar.neighbors_of(row, limit)
+            return self._fragments(catalog, rows, scores), "graph"
+        if snapshot.embeddings is not None:
+            scores = snapshot.embeddings @ snapshot.embeddings[row]
+            scores[row] = -np.inf
+            rows = _top_k(scores, min(limit, len(scores) - 1))
+            return self._fragments(catalog, rows, scores[rows]), "exact"
+        mask = np.ones(len(catalog), dtype=bool)
+        mask[row] = False
+        rows, _, _ = snapshot.lexical.search(catalog.names[row], limit, mask)
+        return self._fragments(catalog, rows, None), "lexical"
+
+    @staticmethod
+    def _rows_by_ids(catalog: ProductCatalog, product_ids: List[int]) -> List[int]:
+        rows = [catalog.row_by_id.get(product_id) for product_id in product_ids]
+        return [row for row in rows if row is not None]
+
+    def score_products(self, product_ids: List[int], query_embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Re-rank known products against an already encoded query: returns them
+        best first with fresh similarity scores, skipping unknown IDs. Costs one
+        dot product per product, no encoding and no index search.
+        """
+        snapshot = self._snapshot
+        catalog = snapshot.catalog
+        rows = np.array([catalog.row_by_id[product_id] for product_id in product_ids
+                         if product_id in catalog.row_by_id], dtype=np.int64)
+        if not len(rows):
+            return []
+        if snapshot.embeddings is None:
+            return catalog.rows(rows)
+        scores = snapshot.embeddings[rows] @ query_embedding
+        order = np.argsort(-scores, kind="stable")
+        return self._results(catalog, rows[order], scores[order])
+
     def filter_products(self, category: str = None, min_price: float = None, max_price: float = None) -> List[Dict[str, Any]]:
         """Filter products by category and price range"""
-        filtered = self.products
-        
-        if category:
-            filtered = [p for p in filtered if p['category'].lower() == category.lower()]
-        
-        if min_price is not None:
-            filtered = [p for p in filtered if p['price'] >= min_price]
-        
-        if max_price is not None:
-            filtered = [p for p in filtered if p['price'] <= max_price]
-        
-        return filtered
+        catalog = self.catalog
+        mask = catalog.filter_mask(category, min_price, max_price)
+        if mask is None:
+            return catalog.to_dicts()
+        return catalog.rows(np.flatnonzero(mask))
 
 # Global instance - in a real app you'd use dependency injection
 product_service = ProductSearchService()
\ No newline at end of file
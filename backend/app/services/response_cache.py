@@ -0,0 +1,58 @@
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import hashlib
+import os
+from app.services.ttl_cache import TTLCache
+from app.services.serialization import dumps
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# Pages of /api/products are keyed by client-chosen (cursor, limit), so they get
+# their own small cache and can't evict the catalog-wide responses
+RESPONSE_PAGE_CACHE_SIZE = int(os.getenv("RESPONSE_PAGE_CACHE_SIZE", "128"))
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header value covers the given ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Pre-serialized response bodies of read-mostly endpoints.
+
+    Entries are keyed by endpoint, parameters and catalog version, so a
+    catalog change makes every old entry unreachable (they age out of the
+    LRU) without any explicit invalidation. Each body carries an ETag
+    derived from the version and its content.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self._entries = TTLCache(maxsize, ttl)
+
+    def get_or_render(self, endpoint: str, params: Hashable, version: int,
+                      build: Callable[[], Any]) -> Tuple[bytes, str]:
+        """
+        (body, ETag) for the endpoint at this catalog version, building it on
+        a miss; build returns either the content or its already encoded JSON.
+        """
+        key = (endpoint, params, version)
+        entry = self._entries.get(key)
+        if entry is None:
+            content = build()
+            body = content if isinstance(content, bytes) else dumps(content)
+            etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+            entry = (body, etag)
+            self._entries.put(key, entry)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._entries.stats()
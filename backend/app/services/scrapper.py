@@ -1,116 +1,180 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import asyncio
+import aiohttp
 import re
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import random
+from app.services.dedup import NearDuplicateDetector
+from app.services.keywords import ProductTagger
+
+# Base URLs of the free product APIs we scrape, keyed by source name
+DEFAULT_SOURCES = {
+    "fake_store": "https://fakestoreapi.com",
+    "dummyjson": "https://dummyjson.com",
+    "platzi": "https://api.escuelajs.co",
+}
+
+# Each source gets its own id range so paginated results never collide
+SOURCE_ID_OFFSETS = {
+    "fake_store": 100000,
+    "dummyjson": 200000,
+    "platzi": 300000,
+}
+
+# Merge decisions included in a refresh report (all of them stay in last_dedup_report)
+DEDUP_REPORT_DECISIONS = 50
+
+
+class ScrapeError(Exception):
+    """Raised when a source cannot be fetched after all retries"""
+
 
 class ProductScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, base_urls: Optional[Dict[str, str]] = None, request_timeout: float = 10.0,
+                 source_timeout: float = 60.0, max_retries: int = 3, backoff: float = 0.5,
+                 page_size: int = 100, max_pages: int = 20, max_connections: int = 20):
+        # Override base_urls to point the scraper at a local stub server
+        self.base_urls = {**DEFAULT_SOURCES, **(base_urls or {})}
+        self.request_timeout = request_timeout
+        self.source_timeout = source_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_connections = max_connections
+        self.deduplicator = NearDuplicateDetector()
+        # Brand and tag keyword tables, extensible through PRODUCT_KEYWORDS_FILE
+        self.tagger = ProductTagger.from_file()
+        self.last_dedup_report = None
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-    
-    def scrape_fake_store_api(self) -> List[Dict[str, Any]]:
+        }
+
+    async def _get_json(self, session: aiohttp.ClientSession, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET a JSON document, retrying network errors, 429s and 5xx with exponential backoff"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        return await response.json(content_type=None)
+                    last_error = f"HTTP {response.status}"
+                    if response.status < 500 and response.status != 429:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = repr(e)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+
+        raise ScrapeError(f"{url} failed: {last_error}")
+
+    async def scrape_fake_store_api(self, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
         """Scrape from Fake Store API - completely free and reliable"""
-        try:
-            response = self.session.get('https://fakestoreapi.com/products')
-            if response.status_code == 200:
-                products = response.json()
-                
-                formatted_products = []
-                for i, product in enumerate(products):
-                    formatted_product = {
-                        "id": product['id'] + 100,  # Offset to avoid conflicts
-                        "name": product['title'],
-                        "description": product['description'],
-                        "price": float(product['price']),
-                        "currency": "USD",
-                        "category": self._format_category(product['category']),
-                        "brand": self._extract_brand(product['title']),
-                        "image_url": product['image'],
-                        "rating": float(product['rating']['rate']),
-                        "review_count": int(product['rating']['count']),
-                        "tags": self._generate_tags(product['title'], product['description'], product['category'])
-                    }
-                    formatted_products.append(formatted_product)
-                
-                print(f"✅ Scraped {len(formatted_products)} products from Fake Store API")
-                return formatted_products
-                
-        except Exception as e:
-            print(f"❌ Error scraping Fake Store API: {e}")
-            return []
-    
-    def scrape_dummyjson_products(self) -> List[Dict[str, Any]]:
+        products = await self._get_json(session, f"{self.base_urls['fake_store']}/products")
+
+        formatted_products = []
+        for product in products:
+            brand, tags = self.tagger.analyze(product['title'], product['description'], product['category'])
+            formatted_product = {
+                "id": product['id'] + SOURCE_ID_OFFSETS['fake_store'],
+                "name": product['title'],
+                "description": product['description'],
+                "price": float(product['price']),
+                "currency": "USD",
+                "category": self._format_category(product['category']),
+                "brand": brand,
+                "image_url": product['image'],
+                "rating": float(product['rating']['rate']),
+                "review_count": int(product['rating']['count']),
+                "tags": tags
+            }
+            formatted_products.append(formatted_product)
+
+        return formatted_products
+
+    async def scrape_dummyjson_products(self, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
         """Scrape from DummyJSON - another free API with good product data"""
-        try:
-            response = self.session.get('https://dummyjson.com/products?limit=30')
-            if response.status_code == 200:
-                data = response.json()
-                products = data['products']
-                
-                formatted_products = []
-                for product in products:
-                    formatted_product = {
-                        "id": product['id'] + 200,  # Offset to avoid conflicts
-                        "name": product['title'],
-                        "description": product['description'],
-                        "price": float(product['price']),
-                        "currency": "USD",
-                        "category": self._format_category(product['category']),
-                        "brand": product.get('brand', self._extract_brand(product['title'])),
-                        "image_url": product['thumbnail'],
-                        "rating": float(product['rating']),
-                        "review_count": random.randint(50, 5000),  # API doesn't provide this
-                        "tags": self._generate_tags(product['title'], product['description'], product['category'])
-                    }
-                    formatted_products.append(formatted_product)
-                
-                print(f"✅ Scraped {len(formatted_products)} products from DummyJSON")
-                return formatted_products
-                
-        except Exception as e:
-            print(f"❌ Error scraping DummyJSON: {e}")
-            return []
-    
-    def scrape_platzi_fake_api(self) -> List[Dict[str, Any]]:
+        products = []
+        for page in range(self.max_pages):
+            data = await self._get_json(
+                session, f"{self.base_urls['dummyjson']}/products",
+                params={"limit": self.page_size, "skip": page * self.page_size}
+            )
+            batch = data.get('products', [])
+            products.extend(batch)
+            if not batch or len(products) >= data.get('total', 0):
+                break
+
+        formatted_products = []
+        for product in products:
+            brand, tags = self.tagger.analyze(product['title'], product['description'], product['category'])
+            formatted_product = {
+                "id": product['id'] + SOURCE_ID_OFFSETS['dummyjson'],
+                "name": product['title'],
+                "description": product['description'],
+                "price": float(product['price']),
+                "currency": "USD",
+                "category": self._format_category(product['category']),
+                "brand": product.get('brand', brand),
+                "image_url": product['thumbnail'],
+                "rating": float(product['rating']),
+                "review_count": random.randint(50, 5000),  # API doesn't provide this
+                "tags": tags
+            }
+            formatted_products.append(formatted_product)
+
+        return formatted_products
+
+    async def scrape_platzi_fake_api(self, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
         """Scrape from Platzi Fake Store API - more product variety"""
+        products = []
+        for page in range(self.max_pages):
+            batch = await self._get_json(
+                session, f"{self.base_urls['platzi']}/api/v1/products",
+                params={"offset": page * self.page_size, "limit": self.page_size}
+            )
+            products.extend(batch)
+            if len(batch) < self.page_size:
+                break
+
+        formatted_products = []
+        for product in products:
+            # Skip products with invalid data
+            if not product.get('title') or not product.get('price'):
+                continue
+
+            brand, tags = self.tagger.analyze(product['title'], product.get('description', ''),
+                                              product.get('category', {}).get('name', ''))
+            formatted_product = {
+                "id": product['id'] + SOURCE_ID_OFFSETS['platzi'],
+                "name": product['title'],
+                "description": product.get('description', 'High-quality product with excellent features'),
+                "price": float(product['price']),
+                "currency": "USD",
+                "category": self._format_category(product.get('category', {}).get('name', 'General')),
+                "brand": brand,
+                "image_url": product['images'][0] if product.get('images') else 'https://via.placeholder.com/300x300/6366f1/ffffff?text=Product',
+                "rating": round(random.uniform(3.5, 4.9), 1),
+                "review_count": random.randint(100, 3000),
+                "tags": tags
+            }
+            formatted_products.append(formatted_product)
+
+        return formatted_products
+
+    async def _scrape_source(self, name: str, scrape, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
+        """Run one source under its own deadline; a failing source yields no products"""
         try:
-            response = self.session.get('https://api.escuelajs.co/api/v1/products?offset=0&limit=20')
-            if response.status_code == 200:
-                products = response.json()
-                
-                formatted_products = []
-                for product in products:
-                    # Skip products with invalid data
-                    if not product.get('title') or not product.get('price'):
-                        continue
-                        
-                    formatted_product = {
-                        "id": product['id'] + 300,  # Offset to avoid conflicts
-                        "name": product['title'],
-                        "description": product.get('description', 'High-quality product with excellent features'),
-                        "price": float(product['price']),
-                        "currency": "USD",
-                        "category": self._format_category(product.get('category', {}).get('name', 'General')),
-                        "brand": self._extract_brand(product['title']),
-                        "image_url": product['images'][0] if product.get('images') else 'https://via.placeholder.com/300x300/6366f1/ffffff?text=Product',
-                        "rating": round(random.uniform(3.5, 4.9), 1),
-                        "review_count": random.randint(100, 3000),
-                        "tags": self._generate_tags(product['title'], product.get('description', ''), product.get('category', {}).get('name', ''))
-                    }
-                    formatted_products.append(formatted_product)
-                
-                print(f"✅ Scraped {len(formatted_products)} products from Platzi API")
-                return formatted_products
-                
+            products = await asyncio.wait_for(scrape(session), timeout=self.source_timeout)
+            print(f"✅ Scraped {len(products)} products from {name}")
+            return products
+        except asyncio.TimeoutError:
+            print(f"❌ Timed out scraping {name} after {self.source_timeout}s")
         except Exception as e:
-            print(f"❌ Error scraping Platzi API: {e}")
-            return []
-    
+            print(f"❌ Error scraping {name}: {e}")
+        return []
+
     def _format_category(self, category: str) -> str:
         """Format category names consistently"""
         if not category:
@@ -133,90 +197,105 @@ class ProductScraper:
         category_lower = category.lower()
         return category_mapping.get(category_lower, category.title())
     
-    def _extract_brand(self, title: str) -> str:
-        """Extract or generate brand from product title"""
-        # Common brand patterns
-        brands = {
-            'apple': 'Apple', 'samsung': 'Samsung', 'nike': 'Nike', 'adidas': 'Adidas',
-            'sony': 'Sony', 'hp': 'HP', 'dell': 'Dell', 'lenovo': 'Lenovo',
-            'asus': 'ASUS', 'acer': 'Acer', 'canon': 'Canon', 'nikon': 'Nikon',
-            'bose': 'Bose', 'jbl': 'JBL', 'beats': 'Beats', 'sennheiser': 'Sennheiser'
-        }
-        
-        title_lower = title.lower()
-        for brand_key, brand_name in brands.items():
-            if brand_key in title_lower:
-                return brand_name
-        
-        # Generate brand from first word if no known brand found
-        first_word = title.split()[0] if title.split() else "Generic"
-        return first_word.title()
-    
-    def _generate_tags(self, title: str, description: str, category: str) -> List[str]:
-        """Generate relevant tags from product information"""
-        text = f"{title} {description} {category}".lower()
-        
-        tag_keywords = {
-            'wireless': ['wireless', 'bluetooth', 'cordless'],
-            'portable': ['portable', 'compact', 'travel', 'lightweight'],
-            'premium': ['premium', 'luxury', 'high-end', 'professional'],
-            'budget': ['cheap', 'affordable', 'budget', 'value'],
-            'gaming': ['gaming', 'gamer', 'esports', 'rgb'],
-            'fitness': ['fitness', 'sport', 'workout', 'exercise', 'running'],
-            'smart': ['smart', 'ai', 'intelligent', 'connected'],
-            'waterproof': ['waterproof', 'water-resistant', 'splash'],
-            'fast': ['fast', 'quick', 'speed', 'rapid'],
-            'comfortable': ['comfortable', 'soft', 'cozy', 'ergonomic']
-        }
-        
-        tags = []
-        for tag, keywords in tag_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                tags.append(tag)
-        
-        # Add category as tag
-        if category and category.lower() not in [tag.lower() for tag in tags]:
-            tags.append(category.lower().replace(' & ', '-').replace(' ', '-'))
-        
-        return tags[:5]  # Limit to 5 tags
-    
+    async def scrape_all(self) -> List[Dict[str, Any]]:
+        """Fetch every source concurrently over one pooled connection set"""
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            results = await asyncio.gather(
+                self._scrape_source("Fake Store API", self.scrape_fake_store_api, session),
+                self._scrape_source("DummyJSON", self.scrape_dummyjson_products, session),
+                self._scrape_source("Platzi API", self.scrape_platzi_fake_api, session),
+            )
+
+        # Combine all products, keeping the source order stable
+        return [product for products in results for product in products]
+
     def get_all_real_products(self) -> List[Dict[str, Any]]:
         """Get products from multiple free APIs"""
-        all_products = []
-        
         print("🌐 Fetching real product data from multiple sources...")
-        
-        # Scrape from multiple free APIs
-        fake_store_products = self.scrape_fake_store_api()
-        dummyjson_products = self.scrape_dummyjson_products()
-        platzi_products = self.scrape_platzi_fake_api()
-        
-        # Combine all products
-        all_products.extend(fake_store_products)
-        all_products.extend(dummyjson_products)
-        all_products.extend(platzi_products)
-        
+
+        all_products = asyncio.run(self.scrape_all())
+
         # Remove duplicates based on name similarity
         unique_products = self._remove_duplicates(all_products)
-        
+
         print(f"🎉 Total unique products loaded: {len(unique_products)}")
         return unique_products
-    
+
     def _remove_duplicates(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate products based on name similarity"""
+        """
+        Remove duplicate products: first exact repeats of the normalized name,
+        then near-duplicates of name and description found with MinHash/LSH.
+
+        The earliest product of each group is kept, so sources win in scrape
+        order. Products whose names carry different model numbers are never
+        merged. Every merge is recorded in last_dedup_report.
+        """
+        start = time.perf_counter()
         unique_products = []
-        seen_names = set()
+        decisions = []
+        seen_names = {}
         
         for product in products:
             # Create a normalized name for comparison
             normalized_name = re.sub(r'[^a-zA-Z0-9\s]', '', product['name'].lower())
             normalized_name = ' '.join(normalized_name.split())
             
-            if normalized_name not in seen_names:
-                seen_names.add(normalized_name)
+            kept = seen_names.get(normalized_name)
+            if kept is None:
+                seen_names[normalized_name] = product
                 unique_products.append(product)
+            else:
+                decisions.append(self._merge_decision(kept, product, "same_name", 1.0))
+        same_name = len(decisions)
+        
+        representative, merges, counts = self.deduplicator.find(
+            [f"{product['name']} {product['description']}" for product in unique_products],
+            guards=[self._model_numbers(product['name']) for product in unique_products]
+        )
+        for kept, dropped, similarity in merges:
+            decisions.append(self._merge_decision(unique_products[kept], unique_products[dropped],
+                                                  "near_duplicate", similarity))
+        unique_products = [product for i, product in enumerate(unique_products) if representative[i] == i]
         
+        self.last_dedup_report = {
+            "scraped": len(products),
+            "unique": len(unique_products),
+            "same_name": same_name,
+            "near_duplicate": len(merges),
+            **counts,
+            "seconds": round(time.perf_counter() - start, 3),
+            "decisions": decisions,
+        }
+        if decisions:
+            print(f"🔁 Merged {len(decisions)} duplicate products ({same_name} same name, {len(merges)} near-duplicates)")
         return unique_products
 
+    @staticmethod
+    def _model_numbers(name: str) -> frozenset:
+        """Name tokens containing a digit, such as 1000xm5 or 128gb"""
+        return frozenset(token for token in re.findall(r'[a-z0-9]+', name.lower()) if any(c.isdigit() for c in token))
+
+    @staticmethod
+    def _merge_decision(kept: Dict[str, Any], dropped: Dict[str, Any], reason: str,
+                        similarity: float) -> Dict[str, Any]:
+        return {
+            "kept_id": kept['id'],
+            "kept_name": kept['name'],
+            "dropped_id": dropped['id'],
+            "dropped_name": dropped['name'],
+            "reason": reason,
+            "similarity": similarity,
+        }
+
+    def dedup_summary(self, decisions: int = DEDUP_REPORT_DECISIONS) -> Optional[Dict[str, Any]]:
+        """The last deduplication report, with only its first merge decisions"""
+        if self.last_dedup_report is None:
+            return None
+        report = dict(self.last_dedup_report)
+        report["decisions"] = report["decisions"][:decisions]
+        return report
+
 # Global instance
 product_scraper = ProductScraper()
\ No newline at end of file
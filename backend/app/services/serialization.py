@@ -0,0 +1,33 @@
+from typing import Any, Dict, Iterable
+import orjson
+
+# Same options as fastapi.responses.ORJSONResponse, so cached and live bodies match
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def encode_array(fragments: Iterable[bytes]) -> bytes:
+    """JSON array of already encoded values"""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def encode_object(fields: Dict[str, Any]) -> bytes:
+    """
+    JSON object whose bytes values are spliced in as already encoded JSON;
+    every other value is encoded here.
+    """
+    members = [
+        dumps(key) + b":" + (value if isinstance(value, bytes) else dumps(value))
+        for key, value in fields.items()
+    ]
+    return b"{" + b",".join(members) + b"}"
+
+
+def extend_object(fragment: bytes, **fields: Any) -> bytes:
+    """Append fields to an encoded, non-empty JSON object"""
+    members = b",".join(dumps(key) + b":" + dumps(value) for key, value in fields.items())
+    return fragment[:-1] + b"," + members + b"}"
@@ -0,0 +1,156 @@
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+import os
+import threading
+import time
+import numpy as np
+
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", "10000"))
+CHAT_SESSION_MAX_TURNS = int(os.getenv("CHAT_SESSION_MAX_TURNS", "20"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+# Global bound on the approximate memory held by all sessions together
+CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Rough per-object overheads used by the size estimate
+_TURN_OVERHEAD = 200
+_SESSION_OVERHEAD = 500
+
+
+class ChatSession:
+    """
+    Conversation state for one user.
+
+    Keeps the last max_turns turns and the most recent result set: the
+    candidate product ids of the last search (best first), the ids that were
+    actually shown, and the query embedding, so follow-ups can re-filter or
+    re-rank those candidates without searching again.
+    """
+
+    def __init__(self, user_id: str, max_turns: int = CHAT_SESSION_MAX_TURNS):
+        self.user_id = user_id
+        self.turns = deque(maxlen=max_turns)
+        self.query = None
+        self.category = None
+        self.candidate_ids = []
+        self.shown_ids = []
+        self.query_embedding = None
+        self.last_active = time.monotonic()
+
+    def add_turn(self, message: str, response: Dict[str, Any]) -> None:
+        self.turns.append({
+            'message': message,
+            'intent': response.get('intent'),
+            'product_ids': [product['id'] for product in response.get('products', [])],
+        })
+
+    def set_results(self, query: str, category: Optional[str], candidate_ids: List[int],
+                    shown_ids: List[int], query_embedding: Optional[np.ndarray]) -> None:
+        self.query = query
+        self.category = category
+        self.candidate_ids = list(candidate_ids)
+        self.shown_ids = list(shown_ids)
+        self.query_embedding = query_embedding
+
+    def has_results(self) -> bool:
+        return bool(self.candidate_ids)
+
+    def size_bytes(self) -> int:
+        """Approximate memory held by this session"""
+        size = _SESSION_OVERHEAD + 8 * (len(self.candidate_ids) + len(self.shown_ids))
+        if self.query_embedding is not None:
+            size += self.query_embedding.nbytes
+        for turn in self.turns:
+            size += _TURN_OVERHEAD + len(turn['message']) + 8 * len(turn['product_ids'])
+        return size
+
+
+class SessionStore:
+    """
+    Bounded, thread-safe store of ChatSessions keyed by user id.
+
+    Sessions are kept in least-recently-used order. Sessions idle for longer
+    than ttl are dropped, and the least recently used ones are evicted
+    whenever there are more than max_sessions or their estimated total size
+    exceeds max_bytes.
+    """
+
+    def __init__(self, max_sessions: int = CHAT_SESSION_MAX_SESSIONS, max_turns: int = CHAT_SESSION_MAX_TURNS,
+                 ttl: float = CHAT_SESSION_TTL, max_bytes: int = CHAT_SESSION_MAX_BYTES):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, user_id: str) -> ChatSession:
+        """The user's session, created if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and now - session.last_active > self.ttl:
+                self._remove(user_id)
+                self.evictions += 1
+                session = None
+            if session is None:
+                session = ChatSession(user_id, self.max_turns)
+                self._sessions[user_id] = session
+                self._sizes[user_id] = session.size_bytes()
+                self._total_bytes += self._sizes[user_id]
+            session.last_active = now
+            self._sessions.move_to_end(user_id)
+            self._evict()
+            return session
+
+    def save(self, session: ChatSession) -> None:
+        """Re-account a session's size after it changed, evicting others if needed"""
+        with self._lock:
+            if self._sessions.get(session.user_id) is not session:
+                return
+            size = session.size_bytes()
+            self._total_bytes += size - self._sizes[session.user_id]
+            self._sizes[session.user_id] = size
+            self._sessions.move_to_end(session.user_id)
+            self._evict()
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._sessions.clear()
+                self._sizes.clear()
+                self._total_bytes = 0
+            elif user_id in self._sessions:
+                self._remove(user_id)
+
+    def _remove(self, user_id: str) -> None:
+        del self._sessions[user_id]
+        self._total_bytes -= self._sizes.pop(user_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+            # Never evict the session just handed out, even if it alone is over budget
+            if len(self._sessions) > 1 and (over_limit or now - session.last_active > self.ttl):
+                self._remove(user_id)
+                self.evictions += 1
+            else:
+                break
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "max_turns": self.max_turns,
+            "ttl_seconds": self.ttl,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,147 @@
+from typing import Any, Dict, Tuple
+import os
+import numpy as np
+
+# Neighbours kept per product
+SIMILAR_PRODUCTS_K = int(os.getenv("SIMILAR_PRODUCTS_K", "12"))
+# Products per row block and per column block of the similarity matmuls; one
+# block of scores is row block x column block float32s (32 MB by default)
+SIMILAR_ROW_BLOCK = int(os.getenv("SIMILAR_ROW_BLOCK", "256"))
+SIMILAR_COLUMN_BLOCK = int(os.getenv("SIMILAR_COLUMN_BLOCK", "32768"))
+# An update touching more than this share of the catalog rebuilds it instead
+SIMILAR_REBUILD_SHARE = 0.5
+
+
+def _merge(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The k best (row, score) columns of each line, best first"""
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.take_along_axis(rows, best, axis=1)
+        scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def nearest_neighbors(embeddings: np.ndarray, query_rows: np.ndarray, k: int,
+                      columns: np.ndarray = None, row_block: int = SIMILAR_ROW_BLOCK,
+                      column_block: int = SIMILAR_COLUMN_BLOCK) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours of query_rows among columns (default: every row) by dot
+    product of unit vectors, excluding each row itself.
+
+    Scores are computed one row block x column block matmul at a time and
+    folded into a running top-k, so memory stays bounded by the block sizes
+    whatever the catalog size. Returns (rows, scores) of shape
+    (len(query_rows), k), best first; missing neighbours are -1 / -inf.
+    """
+    if columns is None:
+        columns = np.arange(len(embeddings))
+    neighbors = np.full((len(query_rows), k), -1, dtype=np.int64)
+    scores = np.full((len(query_rows), k), -np.inf, dtype=np.float32)
+    for start in range(0, len(query_rows), row_block):
+        queries = query_rows[start:start + row_block]
+        vectors = embeddings[queries]
+        best_rows = neighbors[start:start + row_block]
+        best_scores = scores[start:start + row_block]
+        for offset in range(0, len(columns), column_block):
+            block = columns[offset:offset + column_block]
+            similarities = vectors @ embeddings[block].T
+            similarities[queries[:, None] == block[None, :]] = -np.inf
+            best_rows, best_scores = _merge(
+                np.concatenate([best_rows, np.broadcast_to(block, similarities.shape)], axis=1),
+                np.concatenate([best_scores, similarities], axis=1),
+                k,
+            )
+        neighbors[start:start + row_block] = best_rows
+        scores[start:start + row_block] = best_scores
+    neighbors[np.isneginf(scores)] = -1
+    return neighbors, scores
+
+
+def changed_rows(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Rows of new whose embedding differs from old's, appended rows included"""
+    if old.shape[1:] != new.shape[1:]:
+        return np.arange(len(new))
+    shared = min(len(old), len(new))
+    differs = np.flatnonzero((np.asarray(old[:shared]) != np.asarray(new[:shared])).any(axis=1))
+    return np.concatenate([differs, np.arange(shared, len(new))])
+
+
+class SimilarityGraph:
+    """
+    The k most similar products of every catalog row, by embedding cosine.
+
+    Neighbours are stored as an (n, k) int32 array of catalog rows, best
+    first and padded with -1, next to their float32 scores, so a lookup is
+    a slice. Graphs are never mutated: updated() returns a new graph for the
+    next catalog snapshot.
+    """
+
+    def __init__(self, neighbors: np.ndarray, scores: np.ndarray):
+        self.neighbors = neighbors.astype(np.int32)
+        self.scores = scores.astype(np.float32)
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.neighbors)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, k: int = SIMILAR_PRODUCTS_K) -> "SimilarityGraph":
+        """Neighbour lists of every row, from scratch"""
+        return cls(*nearest_neighbors(embeddings, np.arange(len(embeddings)), k))
+
+    def updated(self, embeddings: np.ndarray, changed_rows: np.ndarray) -> "SimilarityGraph":
+        """
+        The graph for a catalog whose embeddings changed at changed_rows
+        (appended rows included), without recomputing every list.
+
+        Changed rows and rows whose list holds a changed row get their lists
+        recomputed; every other row can only gain a changed row as a new
+        neighbour, so its list is merged with its scores against the changed
+        rows alone. Either way the result matches a full rebuild.
+        """
+        n, k = len(embeddings), self.k
+        if n < len(self):
+            # Rows only go away when the whole catalog is replaced
+            return self.build(embeddings, k)
+        changed = np.unique(np.asarray(changed_rows, dtype=np.int64))
+        if not len(changed) and n == len(self):
+            return self
+
+        neighbors = np.full((n, k), -1, dtype=np.int64)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        neighbors[:len(self)] = self.neighbors
+        scores[:len(self)] = self.scores
+
+        stale = np.flatnonzero(np.isin(self.neighbors, changed).any(axis=1))
+        recompute = np.union1d(changed, stale)
+        if len(recompute) > SIMILAR_REBUILD_SHARE * n:
+            return self.build(embeddings, k)
+
+        # Unchanged rows' lists hold no changed row, so merging in their best
+        # changed rows (blocked like a full build) cannot duplicate an entry
+        unchanged = np.setdiff1d(np.arange(n), recompute)
+        gained_rows, gained_scores = nearest_neighbors(embeddings, unchanged, k, columns=changed)
+        neighbors[unchanged], scores[unchanged] = _merge(
+            np.concatenate([neighbors[unchanged], gained_rows], axis=1),
+            np.concatenate([scores[unchanged], gained_scores], axis=1),
+            k,
+        )
+        neighbors[recompute], scores[recompute] = nearest_neighbors(embeddings, recompute, k)
+        neighbors[np.isneginf(scores)] = -1
+        return SimilarityGraph(neighbors, scores)
+
+    def neighbors_of(self, row: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Up to limit (rows, scores) most similar to a row, best first"""
+        rows = self.neighbors[row, :limit]
+        valid = rows >= 0
+        return rows[valid], self.scores[row, :limit][valid]
+
+    def memory_bytes(self) -> int:
+        return int(self.neighbors.nbytes + self.scores.nbytes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"products": len(self), "k": self.k, "memory_bytes": self.memory_bytes()}
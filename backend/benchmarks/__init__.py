@@ -0,0 +1,11 @@
+"""
+Benchmarks for the shopping backend.
+
+    cd backend && python -m benchmarks --sizes 10000 100000
+    cd backend && python -m benchmarks --compare data/benchmarks/previous.json
+
+The full suite (python -m benchmarks) runs against a synthetic catalog with
+a deterministic stub embedding model, so it needs no model download. The
+focused scripts in this package (intent_classifier, chat_streaming) are run
+as their own modules.
+"""
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.synthetic import install_stub_model
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark search, chat, stats and ingestion on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="catalog sizes to run (e.g. 10000 100000 1000000)")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("data", "benchmarks", f"{time.strftime('%Y%m%d-%H%M%S')}.json"),
+                        help="where to write the JSON report")
+    parser.add_argument("--compare", metavar="BASELINE", help="report from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio that counts as a regression when comparing")
+    args = parser.parse_args()
+
+    # The stub model has to be in place before the product service is imported,
+    # and nothing should be read from or written to the embedding store
+    install_stub_model()
+    os.environ["EMBEDDING_STORE_DIR"] = ""
+    from benchmarks.suite import compare_reports, run_suite, write_report
+
+    report = run_suite(args.sizes, args.iterations, args.seed)
+    write_report(report, args.output)
+    print(f"Wrote {args.output}")
+
+    for size, scenarios in report["results"].items():
+        print(f"\n{size} products")
+        for name, stats in scenarios.items():
+            if "p50_ms" in stats:
+                print(f"  {name:<24} p50 {stats['p50_ms']:>10.3f} ms   p99 {stats['p99_ms']:>10.3f} ms")
+            else:
+                print(f"  {name:<24} {stats['mean_ms']:>14.1f} ms   {stats['products_per_second']} products/s")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare_reports(baseline, report, args.threshold)
+    print(f"\nCompared with {args.compare}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"  {row['size']:>8} {row['scenario']:<24} {row['baseline']:>10.3f} -> {row['current']:>10.3f} ms"
+              f"  x{row['ratio']:.2f}{flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Time-to-first-byte of the blocking /api/chat endpoint vs the Server-Sent
+Events /api/chat/stream endpoint.
+
+Requests are driven straight through the ASGI app (no server or network), and
+the query embedding cache is cleared before each one so every request pays
+for encoding and retrieval.
+
+    cd backend && python -m benchmarks.chat_streaming
+"""
+from typing import Any, Dict, List, Tuple
+import asyncio
+import json
+import time
+import numpy as np
+
+from app.main import app
+from app.services.products import product_service
+
+MESSAGES = [
+    "Find wireless headphones under $200",
+    "Recommend a good laptop for students",
+    "Compare iPhone vs Samsung phones",
+    "How good is the Sony WH-1000XM5?",
+    "I'm looking for running shoes",
+]
+
+
+async def timed_request(path: str, body: Dict[str, Any]) -> Tuple[float, float, int]:
+    """(time to first body byte, total time, body chunks) of one POST, in ms"""
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    received = False
+    first_byte = None
+    chunks = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # The client never disconnects; streaming responses wait on this
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal first_byte, chunks
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks += 1
+            if first_byte is None:
+                first_byte = time.perf_counter()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    end = time.perf_counter()
+    return (first_byte - start) * 1000, (end - start) * 1000, chunks
+
+
+def measure(path: str, messages: List[str], repeat: int) -> Dict[str, float]:
+    ttfb, total, chunks = [], [], []
+    for _ in range(repeat):
+        for message in messages:
+            product_service.query_cache.clear()
+            first, elapsed, count = asyncio.run(timed_request(path, {"message": message}))
+            ttfb.append(first)
+            total.append(elapsed)
+            chunks.append(count)
+    return {
+        "ttfb_p50_ms": round(float(np.percentile(ttfb, 50)), 3),
+        "ttfb_p99_ms": round(float(np.percentile(ttfb, 99)), 3),
+        "total_p50_ms": round(float(np.percentile(total, 50)), 3),
+        "mean_chunks": round(float(np.mean(chunks)), 1),
+    }
+
+
+def run(repeat: int = 10) -> Dict[str, Any]:
+    product_service.warm_up()
+    blocking = measure("/api/chat", MESSAGES, repeat)
+    streaming = measure("/api/chat/stream", MESSAGES, repeat)
+    return {
+        "requests": repeat * len(MESSAGES),
+        "blocking": blocking,
+        "streaming": streaming,
+        "ttfb_speedup": round(blocking["ttfb_p50_ms"] / streaming["ttfb_p50_ms"], 2),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,71 @@
+"""
+Throughput and recall of the scraper's near-duplicate detection.
+
+A synthetic catalog is extended with reworded copies of some of its products
+(a suffix on the name, a word dropped from the description and punctuation
+changed, as a second source might list the same item), then deduplicated.
+Recall is the share of injected copies merged into their original, precision
+the share of near-duplicate merges that were such a copy.
+
+    cd backend && python -m benchmarks.dedup --sizes 10000 100000
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import time
+import numpy as np
+
+from app.services.scrapper import ProductScraper
+from benchmarks.synthetic import generate_products
+
+
+def reword(description: str, rng: np.random.Generator) -> str:
+    """Drop one word and change punctuation"""
+    words = description.split()
+    if len(words) > 1:
+        del words[rng.integers(len(words))]
+    return " ".join(words).replace(" - ", ", ")
+
+
+def run_size(size: int, duplicate_share: float = 0.1, seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    products = generate_products(size, seed)
+    originals = rng.choice(size, int(size * duplicate_share), replace=False)
+    copies = []
+    original_of = {}
+    for offset, row in enumerate(originals):
+        original = products[row]
+        copies.append({**original, 'id': size + offset + 1, 'name': f"{original['name']} (New)",
+                       'description': reword(original['description'], rng)})
+        original_of[size + offset + 1] = original['id']
+
+    scraper = ProductScraper()
+    start = time.perf_counter()
+    unique = scraper._remove_duplicates(products + copies)
+    seconds = time.perf_counter() - start
+
+    kept_ids = {product['id'] for product in unique}
+    merged_copies = sum(1 for copy in copies if copy['id'] not in kept_ids)
+    decisions = [decision for decision in scraper.last_dedup_report["decisions"] if decision["reason"] == "near_duplicate"]
+    correct = sum(1 for decision in decisions if original_of.get(decision["dropped_id"]) == decision["kept_id"])
+    report = {key: value for key, value in scraper.last_dedup_report.items() if key != "decisions"}
+    report.update({
+        "products": size + len(copies),
+        "injected_duplicates": len(copies),
+        "recall": round(merged_copies / len(copies), 4) if copies else None,
+        "precision": round(correct / len(decisions), 4) if decisions else None,
+        "products_per_second": round((size + len(copies)) / seconds),
+    })
+    return report
+
+
+def run(sizes: List[int], seed: int = 0) -> Dict[str, Any]:
+    return {str(size): run_size(size, seed=seed) for size in sizes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.dedup")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.seed), indent=2))
@@ -0,0 +1,60 @@
+"""
+Parity check and CPU throughput/latency comparison of the query encoders:
+SentenceTransformer (torch) against the ONNX Runtime export, in float32 and
+with dynamic int8 quantization.
+
+Needs torch, sentence-transformers, onnxruntime and the model weights; the
+ONNX export is written to ONNX_MODEL_DIR on first run.
+
+    cd backend && python -m benchmarks.encoders
+"""
+from typing import Any, Dict
+import json
+import sys
+import numpy as np
+
+from app.services.encoders import OnnxEncoder, check_parity, create_encoder, measure_encoder
+from app.services.products import MODEL_NAME, SAMPLE_PRODUCTS
+from benchmarks.suite import CHAT_MESSAGES, SEARCH_QUERIES
+
+# Minimum per-text cosine between torch and ONNX embeddings
+PARITY_THRESHOLDS = {"onnx": 0.999, "onnx-int8": 0.98}
+
+
+def retrieval_agreement(reference, candidate, queries, documents, top_k: int = 5) -> float:
+    """Mean overlap of the top_k documents each encoder retrieves per query"""
+    def top(encoder):
+        docs = encoder.encode(documents)
+        docs = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+        scores = encoder.encode(queries) @ docs.T
+        return np.argsort(-scores, axis=1)[:, :top_k]
+
+    expected, actual = top(reference), top(candidate)
+    return round(float(np.mean([len(set(e) & set(a)) / top_k for e, a in zip(expected, actual)])), 4)
+
+
+def run() -> Dict[str, Any]:
+    documents = [f"{p['name']} {p['description']} {' '.join(p['tags'])}" for p in SAMPLE_PRODUCTS]
+    queries = SEARCH_QUERIES + [message for messages in CHAT_MESSAGES.values() for message in messages]
+    texts = queries + documents
+
+    torch_encoder = create_encoder(MODEL_NAME, "torch")
+    candidates = {
+        "onnx": OnnxEncoder(MODEL_NAME, quantize=False),
+        "onnx-int8": OnnxEncoder(MODEL_NAME, quantize=True),
+    }
+
+    report = {"model": MODEL_NAME, "torch": measure_encoder(torch_encoder.encode, queries)}
+    for name, encoder in candidates.items():
+        parity = check_parity(torch_encoder, encoder, texts)
+        parity["top5_agreement"] = retrieval_agreement(torch_encoder, encoder, queries, documents)
+        parity["passed"] = parity["min_cosine"] >= PARITY_THRESHOLDS[name]
+        report[name] = {"parity": parity, **measure_encoder(encoder.encode, queries)}
+        report[name]["speedup_p50"] = round(report["torch"]["p50_ms"] / report[name]["p50_ms"], 2)
+    return report
+
+
+if __name__ == "__main__":
+    result = run()
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if all(result[name]["parity"]["passed"] for name in PARITY_THRESHOLDS) else 1)
@@ -0,0 +1,166 @@
+"""
+Regression check and microbenchmark for the chat intent classifier.
+
+Compares app.services.intents.analyze_message against the original
+pattern-by-pattern implementation on a corpus of chat messages, then times
+both.
+
+    cd backend && python -m benchmarks.intent_classifier
+"""
+from typing import Any, Dict, List, Optional
+import re
+import sys
+import time
+
+from app.services.intents import analyze_message
+
+CORPUS = [
+    "Find wireless headphones under $200",
+    "find me some earbuds",
+    "Show me a laptop for coding",
+    "search for a cheap phone",
+    "I'm looking for running shoes",
+    "I need new boots for winter",
+    "want sneakers below 100",
+    "find something under 50",
+    "show gifts less than $25.99",
+    "budget laptop for students",
+    "affordable headphones please",
+    "Compare iPhone vs Samsung phones",
+    "which is better, the ipad or the kindle?",
+    "what's the difference between airpods and bose",
+    "should i get the switch or a laptop",
+    "help me choose between two chairs",
+    "Recommend a good laptop for students",
+    "suggest a blender",
+    "any advice on cameras?",
+    "what should i buy my dad",
+    "best shoes for hiking",
+    "good speaker for parties, budget 150",
+    "How much is the Dyson vacuum?",
+    "what is the price of the yeti tumbler",
+    "does the peloton cost a lot",
+    "How good is the Sony WH-1000XM5?",
+    "is it worth it",
+    "is the roomba reliable",
+    "what are the features of the gopro",
+    "specs of the macbook air",
+    "hello",
+    "hi there!",
+    "help",
+    "thanks a lot",
+    "I want a new jacket",
+    "cooking pot for my kitchen",
+    "fitness tracker with gps",
+    "outdoor furniture",
+    "a tablet stand for my table",
+    "desk chair under 300 dollars",
+    "FIND HEADPHONES",
+    "first line\nfind speakers on the second line",
+    "",
+    "$",
+    "$12.5 or $12.50",
+    "under 20 below 10 less than 5",
+]
+
+
+def legacy_analyze(message: str) -> Dict[str, Any]:
+    """The original _analyze_intent/_extract_budget/_extract_category logic"""
+    message_lower = message.lower()
+    search_patterns = [
+        r'find.*(?:headphones?|earbuds?|speakers?)',
+        r'(?:show|find|search).*(?:laptop|computer|phone)',
+        r'(?:looking for|need|want).*(?:shoes?|sneakers?|boots?)',
+        r'(?:find|show).*(?:under|below|less than).*\$?\d+',
+        r'(?:budget|cheap|affordable).*(?:laptop|phone|headphones?)'
+    ]
+    comparison_patterns = [
+        r'(?:compare|vs|versus|better|difference)',
+        r'(?:which is better|what.*difference)',
+        r'(?:should i get|choose between)'
+    ]
+    recommendation_patterns = [
+        r'(?:recommend|suggest|advice)',
+        r'(?:what should i|help me choose)',
+        r'(?:best.*for|good.*for)'
+    ]
+    question_patterns = [
+        r'(?:how much|what.*price|cost)',
+        r'(?:is.*good|worth it|reliable)',
+        r'(?:what.*features|specs|specifications)'
+    ]
+    if any(re.search(pattern, message_lower) for pattern in search_patterns):
+        intent_type = 'product_search'
+    elif any(re.search(pattern, message_lower) for pattern in comparison_patterns):
+        intent_type = 'comparison'
+    elif any(re.search(pattern, message_lower) for pattern in recommendation_patterns):
+        intent_type = 'recommendation'
+    elif any(re.search(pattern, message_lower) for pattern in question_patterns):
+        intent_type = 'question'
+    else:
+        intent_type = 'general'
+
+    budget: Optional[float] = None
+    for pattern in [r'\$(\d+(?:\.\d{2})?)', r'under (\d+)', r'below (\d+)', r'less than (\d+)', r'budget (\d+)']:
+        match = re.search(pattern, message.lower())
+        if match:
+            budget = float(match.group(1))
+            break
+
+    categories = {
+        'electronics': ['phone', 'laptop', 'computer', 'tablet', 'camera', 'headphones', 'speaker'],
+        'clothing': ['shirt', 'pants', 'dress', 'jacket', 'clothes', 'jeans'],
+        'footwear': ['shoes', 'sneakers', 'boots', 'sandals'],
+        'home & kitchen': ['kitchen', 'cooking', 'blender', 'pot', 'appliance'],
+        'furniture': ['chair', 'desk', 'table', 'furniture'],
+        'sports & outdoors': ['fitness', 'exercise', 'outdoor', 'sports']
+    }
+    category = None
+    for name, keywords in categories.items():
+        if any(keyword in message_lower for keyword in keywords):
+            category = name
+            break
+
+    return {'type': intent_type, 'budget': budget, 'category': category}
+
+
+def check_regressions(corpus: List[str]) -> List[str]:
+    """Messages where the compiled classifier disagrees with the original"""
+    failures = []
+    for message in corpus:
+        expected, actual = legacy_analyze(message), analyze_message(message)
+        if expected != actual:
+            failures.append(f"{message!r}: expected {expected}, got {actual}")
+    return failures
+
+
+def time_per_message(analyze, corpus: List[str], repeat: int) -> float:
+    """Mean microseconds per message"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in corpus:
+            analyze(message)
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+
+def run(repeat: int = 200) -> Dict[str, Any]:
+    failures = check_regressions(CORPUS)
+    legacy_us = time_per_message(legacy_analyze, CORPUS, repeat)
+    compiled_us = time_per_message(analyze_message, CORPUS, repeat)
+    return {
+        "messages": len(CORPUS),
+        "mismatches": failures,
+        "legacy_us_per_message": round(legacy_us, 2),
+        "compiled_us_per_message": round(compiled_us, 2),
+        "speedup": round(legacy_us / compiled_us, 2),
+    }
+
+
+if __name__ == "__main__":
+    result = run()
+    for failure in result["mismatches"]:
+        print(f"MISMATCH {failure}")
+    print(f"{result['messages']} messages, {len(result['mismatches'])} mismatches")
+    print(f"legacy:   {result['legacy_us_per_message']} us/message")
+    print(f"compiled: {result['compiled_us_per_message']} us/message ({result['speedup']}x)")
+    sys.exit(1 if result["mismatches"] else 0)
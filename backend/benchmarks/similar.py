@@ -0,0 +1,93 @@
+"""
+Build time, memory and incremental-update cost of the "similar products"
+neighbour graph.
+
+Synthetic catalogs are embedded with the stub model and the graph is built
+from scratch; a sample of its lists is checked against brute-force ranking.
+Then a refresh is simulated (some products edited, some added) and the
+incremental update is timed against a full rebuild and checked to match it.
+
+    cd backend && python -m benchmarks.similar --sizes 10000 50000
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import time
+import numpy as np
+
+from app.services.similar import SimilarityGraph, changed_rows
+from benchmarks.synthetic import StubEmbeddingModel, generate_products
+
+
+def embed(products: List[Dict[str, Any]], model: StubEmbeddingModel) -> np.ndarray:
+    vectors = model.encode([f"{p['name']} {p['description']} {p['category']}" for p in products])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mismatched_rows(graph: SimilarityGraph, embeddings: np.ndarray, rows: np.ndarray) -> int:
+    """Sampled rows whose neighbour scores differ from brute-force ranking"""
+    scores = embeddings[rows] @ embeddings.T
+    scores[np.arange(len(rows)), rows] = -np.inf
+    expected = -np.sort(-scores, axis=1)[:, :graph.k]
+    return int((~np.isclose(graph.scores[rows], expected, atol=1e-5)).any(axis=1).sum())
+
+
+def run_size(size: int, change_share: float = 0.01, seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    model = StubEmbeddingModel()
+    products = generate_products(size, seed)
+    embeddings = embed(products, model)
+
+    start = time.perf_counter()
+    graph = SimilarityGraph.build(embeddings)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lookups = rng.integers(size, size=10000)
+    for row in lookups:
+        graph.neighbors_of(row, graph.k)
+    lookup_us = (time.perf_counter() - start) / len(lookups) * 1e6
+
+    # A refresh: a share of the products get new descriptions, as many again are added
+    changes = int(size * change_share)
+    edited = rng.choice(size, changes, replace=False)
+    added = generate_products(changes, seed + 1)
+    refreshed = [dict(product) for product in products]
+    for row in edited:
+        refreshed[row]['description'] = f"Updated: {products[rng.integers(size)]['description']}"
+    new_embeddings = embed(refreshed + added, model)
+
+    start = time.perf_counter()
+    updated = graph.updated(new_embeddings, changed_rows(embeddings, new_embeddings))
+    update_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    rebuilt = SimilarityGraph.build(new_embeddings)
+    rebuild_seconds = time.perf_counter() - start
+
+    sample = rng.choice(size, min(size, 500), replace=False)
+    return {
+        "products": size,
+        "k": graph.k,
+        "memory_bytes": graph.memory_bytes(),
+        "build_seconds": round(build_seconds, 3),
+        "lookup_us": round(lookup_us, 2),
+        "sample_mismatches": mismatched_rows(graph, embeddings, sample),
+        "changed_products": 2 * changes,
+        "update_seconds": round(update_seconds, 3),
+        "rebuild_seconds": round(rebuild_seconds, 3),
+        "update_matches_rebuild": bool(np.allclose(updated.scores, rebuilt.scores, atol=1e-5)),
+    }
+
+
+def run(sizes: List[int], seed: int = 0) -> Dict[str, Any]:
+    return {str(size): run_size(size, seed=seed) for size in sizes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.similar")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.seed), indent=2))
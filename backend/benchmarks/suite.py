@@ -0,0 +1,190 @@
+"""
+Benchmark scenarios for search, chat, stats and catalog ingestion.
+
+Endpoints are timed by calling their handler functions in app.main directly,
+so numbers cover the application code and the JSON encoding it does itself,
+without HTTP.
+Install the stub model (benchmarks.synthetic.install_stub_model) before
+calling run_suite.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+
+SEARCH_QUERIES = [
+    "wireless noise canceling headphones",
+    "comfortable running shoes",
+    "laptop for students",
+    "kitchen blender for smoothies",
+    "waterproof outdoor jacket",
+    "ergonomic office chair",
+    "portable bluetooth speaker",
+    "fitness tracker with heart rate",
+    "stainless steel water bottle",
+    "robot vacuum cleaner",
+]
+
+# Messages routed to each chat intent
+CHAT_MESSAGES = {
+    "product_search": ["Find wireless headphones under $200", "Show me a laptop for coding"],
+    "comparison": ["Compare iPhone vs Samsung phones", "which is better, the ipad or the kindle?"],
+    "recommendation": ["Recommend a good blender for smoothies", "suggest a backpack for hiking"],
+    "question": ["How much is the Dyson vacuum?", "what are the features of the gopro"],
+    "general": ["hello", "thanks a lot"],
+}
+
+SCHEMA_VERSION = 1
+
+
+def time_calls(fn: Callable[[int], Any], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    """Latency statistics of fn(i) over `iterations` calls, in milliseconds"""
+    for i in range(warmup):
+        fn(i)
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return {
+        "iterations": iterations,
+        "mean_ms": round(float(latencies.mean()), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "min_ms": round(float(latencies.min()), 4),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(size: int, iterations: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Ingest a synthetic catalog of `size` products and time every scenario on it"""
+    from app import main
+    from app.services.products import ProductCatalog, product_service
+    from benchmarks.synthetic import generate_products
+
+    results = {}
+    products = generate_products(size, seed)
+
+    start = time.perf_counter()
+    ProductCatalog.from_products(products)
+    catalog_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    product_service.load_products(products)
+    ingest_seconds = time.perf_counter() - start
+    results["ingest.catalog"] = {"iterations": 1, "mean_ms": round(catalog_seconds * 1000, 2),
+                                 "products_per_second": round(size / catalog_seconds)}
+    results["ingest.full"] = {"iterations": 1, "mean_ms": round(ingest_seconds * 1000, 2),
+                              "products_per_second": round(size / ingest_seconds)}
+
+    def search(**filters) -> Callable[[int], Any]:
+        defaults = {"limit": 8, "category": None, "min_price": None, "max_price": None, "mode": "semantic"}
+        defaults.update(filters)
+
+        def call(i: int) -> Any:
+            # Every call encodes its query, as a cold query would
+            product_service.query_cache.clear()
+            return main.search_products(q=SEARCH_QUERIES[i % len(SEARCH_QUERIES)], **defaults)
+        return call
+
+    results["search.semantic"] = time_calls(search(), iterations)
+    results["search.filtered"] = time_calls(
+        search(category="electronics", min_price=50.0, max_price=500.0), iterations
+    )
+    results["search.lexical"] = time_calls(search(mode="lexical"), iterations)
+    results["search.hybrid"] = time_calls(search(mode="hybrid"), iterations)
+
+    for intent, messages in CHAT_MESSAGES.items():
+        def chat(i: int, messages: List[str] = messages) -> Any:
+            product_service.query_cache.clear()
+            return main.chat_with_assistant({"message": messages[i % len(messages)]})
+        results[f"chat.{intent}"] = time_calls(chat, iterations)
+
+    def uncached(endpoint: Callable[..., Any]) -> Callable[[int], Any]:
+        def call(i: int) -> Any:
+            # Time the aggregates behind the endpoint, not a response-cache hit
+            main.response_cache.clear()
+            return endpoint(if_none_match=None)
+        return call
+
+    results["stats"] = time_calls(uncached(main.get_stats), iterations)
+    results["categories"] = time_calls(uncached(main.get_categories), iterations)
+    results["brands"] = time_calls(uncached(main.get_brands), iterations)
+
+    ids = np.random.default_rng(seed).integers(1, size + 1, iterations + 3)
+    results["get_product_by_id"] = time_calls(lambda i: main.get_product(int(ids[i])), iterations)
+    return results
+
+
+def run_suite(sizes: List[int], iterations: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """Run every scenario for each catalog size; returns a JSON-serializable report"""
+    from app.services.products import product_service
+
+    product_service.warm_up()
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "index_backend": product_service.index_backend,
+            "precision": product_service.precision,
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        print(f"Benchmarking {size} products...")
+        report["results"][str(size)] = run_size(size, iterations, seed)
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 1.2) -> List[Dict[str, Any]]:
+    """
+    Per-scenario p50 (or single-shot mean) ratios, current over baseline, for
+    every size and scenario present in both reports. A ratio above threshold
+    is marked as a regression.
+    """
+    rows = []
+    for size, scenarios in current["results"].items():
+        for name, stats in scenarios.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            metric = "p50_ms" if "p50_ms" in stats else "mean_ms"
+            if not previous.get(metric):
+                continue
+            ratio = stats[metric] / previous[metric]
+            rows.append({
+                "size": int(size),
+                "scenario": name,
+                "metric": metric,
+                "baseline": previous[metric],
+                "current": stats[metric],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold,
+            })
+    return rows
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
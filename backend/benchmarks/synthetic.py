@@ -0,0 +1,113 @@
+"""
+Synthetic catalogs and a stub embedding model for benchmarking.
+"""
+from typing import Any, Dict, List, Union
+import re
+import sys
+import types
+import zlib
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+VARIANTS = ["Pro", "Lite", "Max", "Mini", "Plus", "Sport", "Classic", "Ultra", "Air", "Essential"]
+ADJECTIVES = ["durable", "lightweight", "premium", "compact", "versatile", "eco-friendly",
+              "ergonomic", "wireless", "waterproof", "portable", "stylish", "quiet"]
+
+
+class StubEmbeddingModel:
+    """
+    Deterministic stand-in for SentenceTransformer.
+
+    Every token gets a fixed pseudo-random vector (seeded by its CRC32) and a
+    text embeds to the sum of its token vectors, so texts that share words
+    are close, results are reproducible across runs and machines, and no
+    weights are downloaded. Encoding is vectorized per batch, so even a
+    million-product catalog embeds in seconds.
+    """
+
+    def __init__(self, dimension: int = 384, seed: int = 0):
+        self.dimension = dimension
+        self.seed = seed
+        self._vectors = {}
+
+    def _vector(self, token: str) -> np.ndarray:
+        vector = self._vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng([self.seed, zlib.crc32(token.encode())])
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            self._vectors[token] = vector
+        return vector
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 4096, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            vocabulary, rows, columns = {}, [], []
+            for row, text in enumerate(batch):
+                for token in TOKEN_PATTERN.findall(text.lower()):
+                    rows.append(row)
+                    columns.append(vocabulary.setdefault(token, len(vocabulary)))
+            if not vocabulary:
+                continue
+            # Bag-of-words counts for the batch times the token vector table
+            flat = np.array(rows, dtype=np.int64) * len(vocabulary) + np.array(columns, dtype=np.int64)
+            counts = np.bincount(flat, minlength=len(batch) * len(vocabulary)).astype(np.float32)
+            table = np.stack([self._vector(token) for token in vocabulary])
+            embeddings[start:start + len(batch)] = counts.reshape(len(batch), len(vocabulary)) @ table
+        return embeddings
+
+
+def install_stub_model(dimension: int = 384) -> None:
+    """
+    Make `sentence_transformers.SentenceTransformer` the stub model.
+
+    Must run before the product service's warm_up() (or a startup event that
+    starts it) first loads the model, since the encoder imports
+    sentence_transformers then; importing app beforehand is fine.
+    """
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = lambda model_name, *args, **kwargs: StubEmbeddingModel(dimension)
+    sys.modules["sentence_transformers"] = module
+
+
+def generate_products(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    A catalog of `count` products shaped like SAMPLE_PRODUCTS.
+
+    Each product is a variation of a sample product: same category, brand,
+    image and tags, a new model name, a reworded description, and a price,
+    rating and review count drawn around the original's.
+    """
+    from app.services.products import SAMPLE_PRODUCTS
+
+    rng = np.random.default_rng(seed)
+    templates = rng.integers(0, len(SAMPLE_PRODUCTS), count)
+    variants = rng.integers(0, len(VARIANTS), count)
+    models = rng.integers(100, 10000, count)
+    adjectives = rng.integers(0, len(ADJECTIVES), (count, 2))
+    price_factors = rng.lognormal(0.0, 0.35, count)
+    rating_offsets = rng.normal(0.0, 0.3, count)
+    review_counts = rng.integers(0, 5000, count)
+
+    products = []
+    for i in range(count):
+        template = SAMPLE_PRODUCTS[templates[i]]
+        first, second = ADJECTIVES[adjectives[i, 0]], ADJECTIVES[adjectives[i, 1]]
+        products.append({
+            'id': i + 1,
+            'name': f"{template['name']} {VARIANTS[variants[i]]} {models[i]}",
+            'description': f"{first.capitalize()} and {second} - {template['description']}",
+            'price': round(float(template['price'] * price_factors[i]), 2),
+            'currency': template['currency'],
+            'category': template['category'],
+            'brand': template['brand'],
+            'image_url': template['image_url'],
+            'rating': round(float(np.clip(template['rating'] + rating_offsets[i], 1.0, 5.0)), 1),
+            'review_count': int(review_counts[i]),
+            'tags': list(template['tags']),
+        })
+    return products
@@ -0,0 +1,145 @@
+"""
+Regression check and microbenchmark for the scraper's brand extractor and
+tagger.
+
+Compares app.services.keywords.ProductTagger against the original
+per-keyword substring scans on a fixture set (the sample catalog, synthetic
+products and edge cases), with the built-in keyword tables and with tables
+grown to a few thousand brands, then times them. The automaton is checked
+and timed both on pyahocorasick (when installed) and in pure Python; small
+tables without pyahocorasick are reported as "substring", the scans the
+tagger falls back to there.
+
+    cd backend && python -m benchmarks.tagger
+"""
+from typing import Any, Dict, List, Tuple
+import sys
+import time
+
+from app.services.keywords import BRAND_KEYWORDS, TAG_KEYWORDS, ProductTagger, ahocorasick
+from app.services.products import SAMPLE_PRODUCTS
+from benchmarks.synthetic import generate_products
+
+# (title, description, category) cases the substring semantics make tricky
+EDGE_CASES = [
+    ("Smartphone Charger", "Fast charging for every smartphone", "electronics"),  # 'hp' inside 'smartphone'
+    ("Placer Gold Pan", "Pan for prospecting", "outdoors"),  # 'acer' inside 'placer'
+    ("Sony vs Apple Earbuds", "Compare the two", "electronics"),  # earlier table entry wins, not earlier position
+    ("Waterproof Water-Resistant Jacket", "Splash proof and cozy", "men's clothing"),
+    ("Gaming Chair", "Ergonomic RGB gaming chair with soft cushions, affordable luxury, quick assembly",
+     "furniture"),  # more than five tags
+    ("", "", ""),
+    ("   ", "no title at all", "General"),
+    ("ΟΔΟΣ", "Σ at the end of a word", "Books"),  # word-final sigma lowercases differently
+    ("İstanbul Lamp", "Lights with a dotted capital I", "home-decoration"),  # lowercasing changes length
+    ("BOSE QC45", "Bluetooth NOISE cancelling", "Electronics"),
+    ("Beats by Dre", "Running wireless headphones", "Sports & Outdoors"),
+    ("Smart TV", "AI upscaling and a connected app store", "Smart"),  # category repeats a tag
+    ("Hp", "h p", "h"),
+]
+
+
+def legacy_extract_brand(title: str, brands: Dict[str, str] = BRAND_KEYWORDS) -> str:
+    """The original _extract_brand"""
+    title_lower = title.lower()
+    for brand_key, brand_name in brands.items():
+        if brand_key in title_lower:
+            return brand_name
+
+    first_word = title.split()[0] if title.split() else "Generic"
+    return first_word.title()
+
+
+def legacy_generate_tags(title: str, description: str, category: str,
+                         tag_keywords: Dict[str, List[str]] = TAG_KEYWORDS) -> List[str]:
+    """The original _generate_tags"""
+    text = f"{title} {description} {category}".lower()
+
+    tags = []
+    for tag, keywords in tag_keywords.items():
+        if any(keyword in text for keyword in keywords):
+            tags.append(tag)
+
+    if category and category.lower() not in [tag.lower() for tag in tags]:
+        tags.append(category.lower().replace(' & ', '-').replace(' ', '-'))
+
+    return tags[:5]
+
+
+def fixtures() -> List[Tuple[str, str, str]]:
+    products = SAMPLE_PRODUCTS + generate_products(2000, seed=1)
+    return [(p['name'], p['description'], p['category']) for p in products] + EDGE_CASES
+
+
+def large_tables(brand_count: int = 3000) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """The built-in tables plus made-up brands, as a keyword file might add"""
+    brands = dict(BRAND_KEYWORDS)
+    for i in range(brand_count):
+        brands[f"brand{i:04d}x"] = f"Brand{i:04d}X"
+    tags = {tag: list(keywords) for tag, keywords in TAG_KEYWORDS.items()}
+    tags['audio'] = ['headphone', 'earbud', 'speaker', 'audio']
+    return brands, tags
+
+
+def check_regressions(tagger: ProductTagger, cases: List[Tuple[str, str, str]], brands: Dict[str, str],
+                      tags: Dict[str, List[str]]) -> List[str]:
+    """Cases where the automaton disagrees with the original scans"""
+    failures = []
+    for title, description, category in cases:
+        expected = (legacy_extract_brand(title, brands), legacy_generate_tags(title, description, category, tags))
+        actual = tagger.analyze(title, description, category)
+        if expected != actual or tagger.brand(title) != expected[0]:
+            failures.append(f"{title!r}: expected {expected}, got {actual}")
+    return failures
+
+
+def time_per_product(analyze, cases: List[Tuple[str, str, str]], repeat: int) -> float:
+    """Mean microseconds per product"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for title, description, category in cases:
+            analyze(title, description, category)
+    return (time.perf_counter() - start) / (repeat * len(cases)) * 1e6
+
+
+def run(repeat: int = 5) -> Dict[str, Any]:
+    cases = fixtures()
+    report = {"products": len(cases)}
+    backends = {"python": False, "native": True} if ahocorasick is not None else {"python": False}
+    for name, (brands, tags) in {"builtin": (BRAND_KEYWORDS, TAG_KEYWORDS), "large": large_tables()}.items():
+        legacy_us = time_per_product(
+            lambda t, d, c: (legacy_extract_brand(t, brands), legacy_generate_tags(t, d, c, tags)), cases, repeat
+        )
+        report[name] = {
+            "keywords": len(brands) + sum(len(keywords) for keywords in tags.values()),
+            "legacy_us_per_product": round(legacy_us, 2),
+        }
+        for backend, native in backends.items():
+            tagger = ProductTagger(brands, tags, native=native)
+            automaton_us = time_per_product(tagger.analyze, cases, repeat)
+            if tagger.substring_scan:
+                backend = "substring"
+            report[name][backend] = {
+                "mismatches": check_regressions(tagger, cases, brands, tags),
+                "us_per_product": round(automaton_us, 2),
+                "speedup": round(legacy_us / automaton_us, 2),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    result = run()
+    failed = False
+    for name in ("builtin", "large"):
+        tables = result[name]
+        print(f"{name} tables ({tables['keywords']} keywords, {result['products']} products): "
+              f"legacy {tables['legacy_us_per_product']} us/product")
+        for backend in ("substring", "python", "native"):
+            if backend not in tables:
+                continue
+            for failure in tables[backend]["mismatches"]:
+                print(f"MISMATCH [{name}/{backend}] {failure}")
+            failed = failed or bool(tables[backend]["mismatches"])
+            print(f"  {backend}: {len(tables[backend]['mismatches'])} mismatches, "
+                  f"{tables[backend]['us_per_product']} us/product ({tables[backend]['speedup']}x)")
+    sys.exit(1 if failed else 0)
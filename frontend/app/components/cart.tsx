@@ -1,6 +1,6 @@
 'use client';
 
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { ShoppingCart, X, Plus, Minus, Trash2 } from 'lucide-react';
 import { useCartStore } from '../store/cart';
 
@@ -13,9 +13,15 @@ export default function Cart() {
     removeItem,
     updateQuantity,
     clearCart,
-    getTotalPrice
+    getTotalPrice,
+    syncItems
   } = useCartStore();
 
+  // Pick up price/availability changes whenever the cart is opened
+  useEffect(() => {
+    if (isOpen) syncItems();
+  }, [isOpen, syncItems]);
+
   const [isAnimating, setIsAnimating] = useState(false);
 
   const formatPrice = (price: number) => {
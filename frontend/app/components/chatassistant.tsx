@@ -2,7 +2,7 @@
 
 import { useState, useRef, useEffect } from 'react';
 import { MessageSquare, Send, X, Bot, User, Sparkles } from 'lucide-react';
-import { api } from '../lib/api';
+import { chatApi } from '../lib/api';
 
 interface Product {
   id: number;
@@ -42,6 +42,17 @@ export default function ChatAssistant() {
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const userIdRef = useRef<string>('');
+
+  // One chat session per browser, so follow-ups like "cheaper ones" refer to this user's results
+  useEffect(() => {
+    let userId = localStorage.getItem('chat_user_id');
+    if (!userId) {
+      userId = `user_${Date.now().toString(36)}${Math.random().toString(36).slice(2, 10)}`;
+      localStorage.setItem('chat_user_id', userId);
+    }
+    userIdRef.current = userId;
+  }, []);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -65,32 +76,39 @@ export default function ChatAssistant() {
     setInputMessage('');
     setIsLoading(true);
 
+    const aiMessageId = (Date.now() + 1).toString();
+    let started = false;
+    const updateAiMessage = (update: Partial<ChatMessage> | ((message: ChatMessage) => Partial<ChatMessage>)) => {
+      if (!started) {
+        started = true;
+        setMessages(prev => [...prev, {
+          id: aiMessageId,
+          text: '',
+          isUser: false,
+          timestamp: new Date(),
+          products: []
+        }]);
+      }
+      setMessages(prev => prev.map(message =>
+        message.id === aiMessageId
+          ? { ...message, ...(typeof update === 'function' ? update(message) : update) }
+          : message
+      ));
+    };
+
     try {
-      const response = await api.post('/api/chat', { 
-        message: inputMessage,
-        user_id: 'user_123' 
+      // Product cards show up as soon as retrieval is done; the text streams in after
+      await chatApi.streamMessage(inputMessage, userIdRef.current || undefined, {
+        onProducts: (data) => updateAiMessage({ products: data.products || [], intent: data.intent }),
+        onDelta: (text) => updateAiMessage(message => ({ text: message.text + text })),
+        onError: (data) => updateAiMessage({ text: data.message, intent: 'error' })
       });
-
-      const aiMessage: ChatMessage = {
-        id: (Date.now() + 1).toString(),
-        text: response.data.message,
-        isUser: false,
-        timestamp: new Date(),
-        products: response.data.products || [],
-        intent: response.data.intent
-      };
-
-      setMessages(prev => [...prev, aiMessage]);
     } catch (error) {
       console.error('Chat error:', error);
-      const errorMessage: ChatMessage = {
-        id: (Date.now() + 1).toString(),
+      updateAiMessage({
         text: "Sorry, I'm having trouble right now. Please try again!",
-        isUser: false,
-        timestamp: new Date(),
         intent: 'error'
-      };
-      setMessages(prev => [...prev, errorMessage]);
+      });
     } finally {
       setIsLoading(false);
     }
@@ -222,7 +240,7 @@ export default function ChatAssistant() {
               ))}
 
               {/* Loading indicator */}
-              {isLoading && (
+              {isLoading && messages[messages.length - 1]?.isUser && (
                 <div className="flex justify-start">
                   <div className="bg-gray-100 p-3 rounded-2xl shadow-md">
                     <div className="flex items-center space-x-2">
@@ -31,12 +31,27 @@ export interface SearchResponse {
   products: Product[];
 }
 
+export interface ProductPage {
+  products: Product[];
+  next_cursor: string | null; // null on the last page
+  limit: number;
+  total_products: number;
+}
+
+export interface SimilarProductsResponse {
+  product_id: number;
+  total_results: number;
+  products: Product[];
+  source: 'graph' | 'exact' | 'lexical';
+}
+
 export interface SearchParams {
   q: string;
   limit?: number;
   category?: string;
   min_price?: number;
   max_price?: number;
+  mode?: 'semantic' | 'lexical' | 'hybrid';
 }
 
 // Test connection to backend
@@ -56,9 +71,21 @@ export const productApi = {
   getProducts: () => 
     api.get<Product[]>('/api/products'),
   
+  // Get one page of products; pass the previous page's next_cursor for the next one
+  getProductsPage: (cursor: string = '', limit: number = 48) =>
+    api.get<ProductPage>('/api/products', { params: { cursor, limit } }),
+  
   // Get single product
   getProduct: (id: number) =>
     api.get<Product>(`/api/products/${id}`),
+
+  // Products most similar to one product, best first
+  getSimilarProducts: (id: number, limit: number = 12) =>
+    api.get<SimilarProductsResponse>(`/api/products/${id}/similar`, { params: { limit } }),
+
+  // Get several products in one round trip (unknown ids are skipped)
+  getProductsByIds: (ids: number[]) =>
+    api.get<Product[]>('/api/products', { params: { ids: ids.join(',') } }),
   
   // AI-powered search
   searchProducts: (params: SearchParams) =>
@@ -69,8 +96,59 @@ export const productApi = {
     api.get('/api/refresh-products'),
 };
 
+export interface ChatStreamHandlers {
+  onIntent?: (data: { intent: string; budget: number | null; category: string | null }) => void;
+  onProducts?: (data: { intent: string; products: Product[] }) => void;
+  onDelta?: (text: string) => void;
+  onError?: (data: { message: string }) => void;
+}
+
+// Read a Server-Sent Events response from /api/chat/stream, dispatching each event as it arrives
+const streamChat = async (message: string, userId: string | undefined, handlers: ChatStreamHandlers) => {
+  const response = await fetch(`${API_BASE_URL}/api/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ message, user_id: userId }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Chat stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'intent') handlers.onIntent?.(payload);
+      else if (event === 'products') handlers.onProducts?.(payload);
+      else if (event === 'message') handlers.onDelta?.(payload.delta);
+      else if (event === 'error') handlers.onError?.(payload);
+    }
+  }
+};
+
 // Chat API
 export const chatApi = {
   sendMessage: (message: string, userId?: string) =>
     api.post('/api/chat', { message, user_id: userId }),
+
+  // Streaming variant: product cards arrive as soon as retrieval is done, then the text
+  streamMessage: streamChat,
 };
\ No newline at end of file
@@ -35,6 +35,8 @@ export default function Home() {
   const [backendStatus, setBackendStatus] = useState<string>('checking...');
   const [backendData, setBackendData] = useState<any>(null);
   const [products, setProducts] = useState<Product[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [searchResults, setSearchResults] = useState<SearchResponse | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [hasSearched, setHasSearched] = useState(false);
@@ -47,9 +49,10 @@ export default function Home() {
         setBackendData(data);
         setBackendStatus('connected');
         
-        // Load initial products
-        const productsResponse = await productApi.getProducts();
-        setProducts(productsResponse.data);
+        // Load the first page of products
+        const productsResponse = await productApi.getProductsPage();
+        setProducts(productsResponse.data.products);
+        setNextCursor(productsResponse.data.next_cursor);
       } catch (error) {
         setBackendStatus('disconnected');
         console.error('Failed to connect to backend:', error);
@@ -76,6 +79,21 @@ export default function Home() {
     }
   };
 
+  // Append the next page of products to the grid
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await productApi.getProductsPage(nextCursor);
+      setProducts(current => [...current, ...response.data.products]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Failed to load more products:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const displayProducts = searchResults ? searchResults.products : products;
 
 
@@ -156,6 +174,7 @@ export default function Home() {
 
         {/* Products Grid with 3D Animation */}
         {displayProducts.length > 0 ? (
+          <>
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-8">
             {displayProducts.map((product, index) => (
               <div
@@ -173,6 +192,20 @@ export default function Home() {
               </div>
             ))}
           </div>
+
+          {/* Next page of the catalog (search results come in one page) */}
+          {!searchResults && nextCursor && (
+            <div className="text-center mt-10">
+              <button
+                onClick={handleLoadMore}
+                disabled={isLoadingMore}
+                className="px-6 py-3 rounded-xl bg-gradient-to-r from-blue-600 to-purple-600 text-white font-bold shadow-lg hover:scale-105 transition-transform duration-300 disabled:opacity-60"
+              >
+                {isLoadingMore ? 'Loading...' : 'Load more products'}
+              </button>
+            </div>
+          )}
+          </>
         ) : (
           <div className="text-center py-16">
             {isLoading ? (
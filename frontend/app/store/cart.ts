@@ -1,4 +1,5 @@
 import { create } from 'zustand';
+import { productApi } from '../lib/api';
 
 interface Product {
   id: number;
@@ -32,6 +33,7 @@ interface CartStore {
   toggleCart: () => void;
   getItemCount: () => number;
   getTotalPrice: () => number;
+  syncItems: () => Promise<void>;
 }
 
 export const useCartStore = create<CartStore>((set, get) => ({
@@ -100,5 +102,23 @@ export const useCartStore = create<CartStore>((set, get) => ({
   getTotalPrice: () => {
     const state = get();
     return state.items.reduce((total, item) => total + (item.price * item.quantity), 0);
+  },
+
+  // Refresh cart items with current product data in a single batch request
+  syncItems: async () => {
+    const ids = get().items.map(item => item.id);
+    if (ids.length === 0) return;
+
+    try {
+      const response = await productApi.getProductsByIds(ids);
+      const latest = new Map(response.data.map(product => [product.id, product]));
+      set(state => ({
+        items: state.items
+          .filter(item => latest.has(item.id))
+          .map(item => ({ ...item, ...latest.get(item.id)!, quantity: item.quantity }))
+      }));
+    } catch (error) {
+      console.error('Failed to sync cart items:', error);
+    }
   }
 }));
\ No newline at end of file